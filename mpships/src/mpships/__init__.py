@@ -4,11 +4,22 @@ __author__ = """Ruoxi Yang"""
 __email__ = "yangroxie@gmail.com"
 __version__ = "0.1.0"
 
+import importlib
 from pathlib import Path
 
-from mpships.materials_graph.materials_graph import MaterialsGraphAIO
-from mpships.redox_thermo_csp.redox_thermo_csp import RedoxThermoCSPAIO
-
 MODULE_PATH = str(Path(__file__).parents[0])
 
+# the apps require Dash and mp_web, so they are imported on first access and
+# modules like mpships.redis_store can be used without them
+_APPS = {
+    "MaterialsGraphAIO": "mpships.materials_graph.materials_graph",
+    "RedoxThermoCSPAIO": "mpships.redox_thermo_csp.redox_thermo_csp",
+}
+
 __all__ = ["MODULE_PATH", "MaterialsGraphAIO", "RedoxThermoCSPAIO"]
+
+
+def __getattr__(name):
+    if name in _APPS:
+        return getattr(importlib.import_module(_APPS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
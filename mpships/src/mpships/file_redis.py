@@ -0,0 +1,403 @@
+"""File-backed implementation of the Redis commands used by redis_store.
+
+FileRedis is a key-value store in one SQLite database in WAL mode, shared by
+all processes that open the same directory: readers do not block the writer,
+and writes are serialized by SQLite. It is not a memory-mapped index of the
+values; mmap_size only lets SQLite read its pages through a memory map.
+This replaces FakeRedis for deployments with several workers on one host and
+no Redis server; select it with a URL like `file:///var/cache/mpships`.
+
+Entries only expire with their ttl. The least recently used entries are only
+evicted while `redis_store.max_bytes` is set, otherwise the database grows
+without bound.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+from redis.exceptions import ResponseError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS strings (key TEXT PRIMARY KEY, value BLOB);
+CREATE TABLE IF NOT EXISTS hashes
+    (key TEXT, field TEXT, value BLOB, PRIMARY KEY (key, field));
+CREATE TABLE IF NOT EXISTS zsets
+    (key TEXT, member TEXT, score REAL, PRIMARY KEY (key, member));
+CREATE INDEX IF NOT EXISTS zsets_score ON zsets (key, score, member);
+CREATE TABLE IF NOT EXISTS expires (key TEXT PRIMARY KEY, at REAL);
+CREATE INDEX IF NOT EXISTS expires_at ON expires (at);
+"""
+TABLES = ["strings", "hashes", "zsets", "expires"]
+
+READ_COMMANDS = [
+    "get",
+    "mget",
+    "exists",
+    "ttl",
+    "hget",
+    "hmget",
+    "hgetall",
+    "hlen",
+    "zrange",
+    "zcard",
+    "keys",
+]
+WRITE_COMMANDS = [
+    "set",
+    "delete",
+    "expire",
+    "persist",
+    "renamenx",
+    "hset",
+    "hsetnx",
+    "hdel",
+    "hincrby",
+    "zadd",
+    "zrem",
+    "flushall",
+]
+
+
+def _str(key) -> str:
+    return key.decode("utf-8") if isinstance(key, bytes) else str(key)
+
+
+def _bytes(value) -> bytes:
+    """Encodes values like redis-py"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return str(value).encode("utf-8")
+
+
+class FileRedis:
+    """Subset of the redis.StrictRedis interface, stored in path/redis_store.sqlite3.
+
+    Values are returned as bytes, like redis-py without decode_responses.
+    Expired keys are ignored by reads and deleted by the next write.
+    """
+
+    def __init__(self, path, mmap_size=2**30, timeout=30):
+        os.makedirs(path, exist_ok=True)
+        self.path = os.path.join(path, "redis_store.sqlite3")
+        self.mmap_size = mmap_size
+        self.timeout = timeout
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls(unquote(urlparse(url).path), **kwargs)
+
+    @property
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.db = db
+        return db
+
+    def pipeline(self, transaction=True):
+        """All commands of a pipeline run in one SQLite transaction"""
+        return FilePipeline(self)
+
+    def _execute(self, commands, raise_on_error=True):
+        """Runs commands, a list of (name, args, kwargs), in one transaction"""
+        db = self._db
+        write = any(name in WRITE_COMMANDS for name, _, _ in commands)
+        # writes lock the database from the start, so that they never fail to
+        # upgrade a read lock
+        db.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        try:
+            if write:
+                self._purge(db)
+            results = []
+            for name, args, kwargs in commands:
+                try:
+                    results.append(getattr(self, f"_{name}")(db, *args, **kwargs))
+                except Exception as e:
+                    if raise_on_error:
+                        raise
+                    results.append(e)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return results
+
+    def _purge(self, db):
+        expired = "SELECT key FROM expires WHERE at <= ?"
+        now = time.time()
+        for table in TABLES:
+            db.execute(f"DELETE FROM {table} WHERE key IN ({expired})", (now,))
+
+    @staticmethod
+    def _alive(db, key) -> bool:
+        row = db.execute("SELECT at FROM expires WHERE key = ?", (key,)).fetchone()
+        return row is None or row[0] > time.time()
+
+    def _exists_key(self, db, key) -> bool:
+        return self._alive(db, key) and any(
+            db.execute(
+                f"SELECT 1 FROM {table} WHERE key = ? LIMIT 1", (key,)
+            ).fetchone()
+            for table in ["strings", "hashes", "zsets"]
+        )
+
+    def _delete_key(self, db, key) -> bool:
+        existed = self._exists_key(db, key)
+        for table in TABLES:
+            db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+        return existed
+
+    def _get(self, db, key):
+        key = _str(key)
+        if not self._alive(db, key):
+            return None
+        row = db.execute("SELECT value FROM strings WHERE key = ?", (key,)).fetchone()
+        return row and row[0]
+
+    def _mget(self, db, keys, *args):
+        return [self._get(db, key) for key in [*keys, *args]]
+
+    def _set(self, db, key, value, ex=None, nx=False):
+        key = _str(key)
+        if nx and self._exists_key(db, key):
+            return None
+        self._delete_key(db, key)
+        db.execute("INSERT INTO strings VALUES (?, ?)", (key, _bytes(value)))
+        if ex is not None:
+            self._expire(db, key, ex)
+        return True
+
+    def _delete(self, db, *keys):
+        return sum(self._delete_key(db, _str(key)) for key in keys)
+
+    def _exists(self, db, *keys):
+        return sum(self._exists_key(db, _str(key)) for key in keys)
+
+    def _expire(self, db, key, seconds):
+        key = _str(key)
+        if not self._exists_key(db, key):
+            return False
+        db.execute(
+            "INSERT OR REPLACE INTO expires VALUES (?, ?)",
+            (key, time.time() + float(seconds)),
+        )
+        return True
+
+    def _persist(self, db, key):
+        return (
+            db.execute("DELETE FROM expires WHERE key = ?", (_str(key),)).rowcount > 0
+        )
+
+    def _ttl(self, db, key):
+        key = _str(key)
+        if not self._exists_key(db, key):
+            return -2
+        row = db.execute("SELECT at FROM expires WHERE key = ?", (key,)).fetchone()
+        return -1 if row is None else max(0, round(row[0] - time.time()))
+
+    def _renamenx(self, db, src, dst):
+        src, dst = _str(src), _str(dst)
+        if not self._exists_key(db, src):
+            raise ResponseError("no such key")
+        if self._exists_key(db, dst):
+            return False
+        for table in TABLES:
+            db.execute(f"DELETE FROM {table} WHERE key = ?", (dst,))
+            db.execute(f"UPDATE {table} SET key = ? WHERE key = ?", (dst, src))
+        return True
+
+    def _hget(self, db, key, field):
+        return self._hmget(db, key, [field])[0]
+
+    def _hmget(self, db, key, fields, *args):
+        key = _str(key)
+        fields = [_str(field) for field in [*fields, *args]]
+        if not self._alive(db, key):
+            return [None] * len(fields)
+        values = dict(
+            db.execute(
+                "SELECT field, value FROM hashes WHERE key = ? AND field IN "
+                f"({', '.join('?' * len(fields))})",
+                (key, *fields),
+            ).fetchall()
+        )
+        return [values.get(field) for field in fields]
+
+    def _hgetall(self, db, key):
+        key = _str(key)
+        if not self._alive(db, key):
+            return {}
+        rows = db.execute("SELECT field, value FROM hashes WHERE key = ?", (key,))
+        return {_bytes(field): value for field, value in rows}
+
+    def _hlen(self, db, key):
+        return len(self._hgetall(db, key))
+
+    def _hset(self, db, key, field=None, value=None, mapping=None):
+        key = _str(key)
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        added = 0
+        for item_field, item_value in items.items():
+            item_field = _str(item_field)
+            added += not db.execute(
+                "SELECT 1 FROM hashes WHERE key = ? AND field = ?", (key, item_field)
+            ).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?)",
+                (key, item_field, _bytes(item_value)),
+            )
+        return added
+
+    def _hsetnx(self, db, key, field, value):
+        return db.execute(
+            "INSERT OR IGNORE INTO hashes VALUES (?, ?, ?)",
+            (_str(key), _str(field), _bytes(value)),
+        ).rowcount
+
+    def _hdel(self, db, key, *fields):
+        return sum(
+            db.execute(
+                "DELETE FROM hashes WHERE key = ? AND field = ?",
+                (_str(key), _str(field)),
+            ).rowcount
+            for field in fields
+        )
+
+    def _hincrby(self, db, key, field, amount=1):
+        value = int(self._hget(db, key, field) or 0) + int(amount)
+        self._hset(db, key, field, value)
+        return value
+
+    def _zadd(self, db, key, mapping, xx=False):
+        key = _str(key)
+        added = 0
+        for member, score in mapping.items():
+            member = _str(member)
+            updated = db.execute(
+                "UPDATE zsets SET score = ? WHERE key = ? AND member = ?",
+                (float(score), key, member),
+            ).rowcount
+            if not updated and not xx:
+                db.execute(
+                    "INSERT INTO zsets VALUES (?, ?, ?)", (key, member, float(score))
+                )
+                added += 1
+        return added
+
+    def _zrange(self, db, key, start, end):
+        key = _str(key)
+        if not self._alive(db, key):
+            return []
+        query = "SELECT member FROM zsets WHERE key = ? ORDER BY score, member"
+        if start >= 0 and end >= -1:
+            # only read the requested range, e.g. the oldest entries of the LRU
+            limit = -1 if end == -1 else max(0, end - start + 1)
+            rows = db.execute(f"{query} LIMIT ? OFFSET ?", (key, limit, start))
+            return [_bytes(member) for (member,) in rows]
+        members = [_bytes(member) for (member,) in db.execute(query, (key,))]
+        return members[start : None if end == -1 else end + 1]
+
+    def _zrem(self, db, key, *members):
+        return sum(
+            db.execute(
+                "DELETE FROM zsets WHERE key = ? AND member = ?",
+                (_str(key), _str(member)),
+            ).rowcount
+            for member in members
+        )
+
+    def _zcard(self, db, key):
+        key = _str(key)
+        if not self._alive(db, key):
+            return 0
+        return db.execute(
+            "SELECT COUNT(*) FROM zsets WHERE key = ?", (key,)
+        ).fetchone()[0]
+
+    def _keys(self, db, pattern="*"):
+        keys = db.execute(
+            " UNION ".join(
+                f"SELECT key FROM {table} WHERE key GLOB ?"
+                for table in ["strings", "hashes", "zsets"]
+            ),
+            (_str(pattern),) * 3,
+        )
+        return [_bytes(key) for (key,) in keys if self._alive(db, key)]
+
+    def _flushall(self, db):
+        for table in TABLES:
+            db.execute(f"DELETE FROM {table}")
+        return True
+
+
+class FilePipeline:
+    """Queues commands of a FileRedis and runs them in one transaction"""
+
+    def __init__(self, client):
+        self.client = client
+        self.command_stack = []
+
+    def execute(self, raise_on_error=True):
+        commands, self.command_stack = self.command_stack, []
+        return self.client._execute(commands, raise_on_error)
+
+
+class AsyncFileRedis:
+    """redis.asyncio-like interface of a FileRedis, whose commands run in
+    worker threads"""
+
+    def __init__(self, client: FileRedis):
+        self.client = client
+
+    def pipeline(self, transaction=True):
+        return AsyncFilePipeline(self.client)
+
+
+class AsyncFilePipeline(FilePipeline):
+    async def execute(self, raise_on_error=True):
+        return await asyncio.to_thread(FilePipeline.execute, self, raise_on_error)
+
+
+def _command(name):
+    def command(self, *args, **kwargs):
+        return self._execute([(name, args, kwargs)])[0]
+
+    command.__name__ = name
+    return command
+
+
+def _queued_command(name):
+    def command(self, *args, **kwargs):
+        self.command_stack.append((name, args, kwargs))
+        return self
+
+    command.__name__ = name
+    return command
+
+
+def _async_command(name):
+    async def command(self, *args, **kwargs):
+        return await asyncio.to_thread(getattr(self.client, name), *args, **kwargs)
+
+    command.__name__ = name
+    return command
+
+
+for _name in READ_COMMANDS + WRITE_COMMANDS:
+    setattr(FileRedis, _name, _command(_name))
+    setattr(FilePipeline, _name, _queued_command(_name))
+    setattr(AsyncFileRedis, _name, _async_command(_name))
@@ -1,77 +1,1599 @@
+import asyncio
+import copy
 import fakeredis
+import functools
 import hashlib
+import inspect
 import io
 import json
 import logging
+import numpy as np
 import os
 import pandas as pd
+import pickle
 import plotly
 import redis
+import redis.asyncio
+import sqlite3
+import struct
+import threading
+import time
+import uuid
 import warnings
+import zlib
 
-from mp_web.settings import SETTINGS
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar
+
+from mpships.file_redis import AsyncFileRedis, FileRedis
 
 logger = logging.getLogger(__name__)
 
 
+# rows per Parquet row group, small enough to skip most of them in filtered loads
+PARQUET_ROW_GROUP_SIZE = 4096
+
+
+def _parquet_engine() -> str:
+    engine = pd.get_option("io.parquet.engine")
+    if engine == "auto":
+        try:
+            import pyarrow.parquet  # noqa: F401
+
+            engine = "pyarrow"
+        except ImportError:
+            engine = "fastparquet"
+    return engine
+
+
+def _parquet_codec(compression):
+    def encode(df: pd.DataFrame) -> bytes:
+        engine = _parquet_engine()
+        row_groups = (
+            {"row_group_size": PARQUET_ROW_GROUP_SIZE}
+            if engine == "pyarrow"
+            else {"row_group_offsets": PARQUET_ROW_GROUP_SIZE}
+        )
+        buffer = io.BytesIO()
+        # the index is written as a column, so that it survives skipped row groups
+        df.to_parquet(
+            buffer, engine=engine, compression=compression, index=True, **row_groups
+        )
+        return buffer.getvalue()
+
+    def decode(serialized_value: bytes, columns=None) -> pd.DataFrame:
+        return pd.read_parquet(io.BytesIO(serialized_value), columns=columns)
+
+    return encode, decode
+
+
+def _feather_codec(compression):
+    # Arrow IPC requires pyarrow, which is an optional dependency
+    def encode(df: pd.DataFrame) -> bytes:
+        import pyarrow as pa
+        import pyarrow.feather
+
+        sink = pa.BufferOutputStream()
+        pyarrow.feather.write_feather(
+            pa.Table.from_pandas(df), sink, compression=compression
+        )
+        return sink.getvalue().to_pybytes()
+
+    def decode(serialized_value: bytes, columns=None) -> pd.DataFrame:
+        import pyarrow as pa
+        import pyarrow.feather
+        import pyarrow.ipc
+
+        if columns is not None:
+            # the index is stored as columns, which must be read with the others
+            schema = pyarrow.ipc.open_file(pa.BufferReader(serialized_value)).schema
+            columns = list(columns) + [
+                index_column
+                for index_column in (schema.pandas_metadata or {}).get(
+                    "index_columns", []
+                )
+                if isinstance(index_column, str)
+            ]
+        return pyarrow.feather.read_table(
+            pa.BufferReader(serialized_value), columns=columns
+        ).to_pandas()
+
+    return encode, decode
+
+
+def _read_parquet_filtered(serialized_value: bytes, filters: list) -> pd.DataFrame:
+    """Reads the row groups whose column statistics may match filters"""
+    if _parquet_engine() == "pyarrow":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(pa.BufferReader(serialized_value))
+        pandas_metadata = parquet_file.schema_arrow.pandas_metadata
+    else:
+        import fastparquet
+
+        parquet_file = fastparquet.ParquetFile(io.BytesIO(serialized_value))
+        pandas_metadata = parquet_file.pandas_metadata
+    # a range index, written without index=True, cannot be restored for a
+    # subset of the row groups
+    if any(
+        isinstance(index_column, dict)
+        for index_column in (pandas_metadata or {}).get("index_columns", [])
+    ):
+        filters = None
+    if _parquet_engine() == "pyarrow":
+        return pq.read_table(
+            pa.BufferReader(serialized_value),
+            filters=filters,
+            use_pandas_metadata=True,
+        ).to_pandas()
+    return parquet_file.to_pandas(filters=filters or [])
+
+
+def _range_mask(df: pd.DataFrame, ranges: dict):
+    mask = pd.Series(True, index=df.index)
+    for column, (lo, hi) in ranges.items():
+        mask &= df[column].between(lo, hi)
+    return mask.to_numpy()
+
+
+# (encode, decode) of DataFrames per codec id; the id is stored with each entry.
+# decode only decodes the given columns if columns is not None
+CODECS = {
+    "parquet-gzip": _parquet_codec("gzip"),
+    "parquet-zstd": _parquet_codec("zstd"),
+    "parquet-lz4": _parquet_codec("lz4"),
+    "parquet-snappy": _parquet_codec("snappy"),
+    "parquet": _parquet_codec(None),
+    "feather-zstd": _feather_codec("zstd"),
+    "feather-lz4": _feather_codec("lz4"),
+    "feather": _feather_codec("uncompressed"),
+}
+
+
+# globals that values saved with the type "pickle" may reference
+_PICKLE_ALLOWLIST = {
+    (module, name)
+    for module, names in [
+        ("numpy", ["dtype", "ndarray"]),
+        ("numpy._core.multiarray", ["_reconstruct", "scalar"]),
+        ("numpy.core.multiarray", ["_reconstruct", "scalar"]),
+        ("numpy._core.numeric", ["_frombuffer"]),
+        ("numpy.core.numeric", ["_frombuffer"]),
+        ("builtins", ["complex", "set", "frozenset", "bytearray"]),
+    ]
+    for name in names
+}
+_PLAIN_TYPES = {type(None), bool, int, float, complex, str, bytes}
+
+
+def _is_plain(value) -> bool:
+    """Whether value only consists of builtins and numpy arrays/scalars, which
+    the pickle allowlist can restore"""
+    value_type = type(value)
+    if value_type in _PLAIN_TYPES:
+        return True
+    if value_type in (list, tuple, set, frozenset):
+        return all(_is_plain(item) for item in value)
+    if value_type is dict:
+        return all(_is_plain(k) and _is_plain(v) for k, v in value.items())
+    if value_type is np.ndarray or isinstance(value, np.generic):
+        return not value.dtype.hasobject
+    return False
+
+
+class _AllowlistUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) not in _PICKLE_ALLOWLIST:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed")
+        return super().find_class(module, name)
+
+
+def _pickle_dumps(value) -> bytes:
+    """Pickles value with protocol 5. The data of contiguous arrays is appended
+    out-of-band after the pickle, aligned to 16 bytes, as
+    count, pickle length, buffer lengths, pickle, buffers."""
+    buffers = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    parts = [
+        struct.pack(
+            f"<{len(raws) + 2}Q", len(raws), len(data), *[raw.nbytes for raw in raws]
+        ),
+        data,
+    ]
+    offset = 8 * (len(raws) + 2) + len(data)
+    for raw in raws:
+        parts.append(b"\0" * (-offset % 16))
+        parts.append(raw)
+        offset += -offset % 16 + raw.nbytes
+    return b"".join(parts)
+
+
+def _pickle_loads(serialized_value: bytes):
+    """Restores a value of _pickle_dumps. Arrays are read-only views of
+    serialized_value, so their data is not copied."""
+    view = memoryview(serialized_value)
+    (count,) = struct.unpack_from("<Q", view)
+    data_length, *lengths = struct.unpack_from(f"<{count + 1}Q", view, 8)
+    offset = 8 * (count + 2)
+    data = view[offset : offset + data_length]
+    offset += data_length
+    buffers = []
+    for length in lengths:
+        offset += -offset % 16
+        buffers.append(view[offset : offset + length])
+        offset += length
+    return _AllowlistUnpickler(io.BytesIO(data), buffers=buffers).load()
+
+
+def _update_digest(digest, value):
+    """Feeds a canonical encoding of value to digest, which is the same in every
+    process for equal arguments (unlike hash() or the repr of objects).
+
+    Raises a TypeError for values other than builtins, numpy arrays/scalars
+    and hashable DataFrames.
+    """
+
+    def put(tag: bytes, data: bytes):
+        digest.update(tag + struct.pack("<Q", len(data)) + data)
+
+    if isinstance(value, np.generic):
+        # numpy scalars are keyed like the equal Python numbers
+        value = value.item()
+    value_type = type(value)
+    if value_type is bytes:
+        put(b"b", value)
+    elif value_type in _PLAIN_TYPES:
+        put(value_type.__name__.encode("utf-8"), repr(value).encode("utf-8"))
+    elif value_type in (list, tuple):
+        put(value_type.__name__.encode("utf-8"), struct.pack("<Q", len(value)))
+        for item in value:
+            _update_digest(digest, item)
+    elif value_type in (dict, set, frozenset):
+        # unordered, so the items are sorted by their own digests
+        items = value.items() if value_type is dict else ((v, None) for v in value)
+        keyed = []
+        for k, v in items:
+            key_digest = hashlib.blake2b()
+            _update_digest(key_digest, k)
+            keyed.append((key_digest.digest(), v))
+        put(value_type.__name__.encode("utf-8"), struct.pack("<Q", len(keyed)))
+        for key_digest, v in sorted(keyed, key=lambda item: item[0]):
+            digest.update(key_digest)
+            if value_type is dict:
+                _update_digest(digest, v)
+    elif value_type is np.ndarray and not value.dtype.hasobject:
+        put(b"ndarray", json.dumps([value.dtype.str, value.shape]).encode("utf-8"))
+        put(b"data", np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, pd.DataFrame) and redis_store.fingerprint(value):
+        put(b"DataFrame", redis_store.fingerprint(value).encode("utf-8"))
+    else:
+        raise TypeError(f"Cannot hash arguments of type {value_type.__name__}")
+
+
+class _LazyClient:
+    """Class attribute whose Redis client is created on first access, and again
+    after reset, e.g. in forked child processes, so that processes never share
+    connections"""
+
+    def __init__(self, create):
+        self._create = create
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __get__(self, obj, owner):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create()
+        return self._client
+
+    def reset(self):
+        # the lock may have been held by another thread of the parent
+        self._lock = threading.Lock()
+        self._client = None
+
+
+class LocalCache:
+    """Bounded in-process LRU cache of deserialized objects, keyed by hash.
+
+    Hash keys identify immutable content, so entries never need to be
+    invalidated; they are dropped when max_bytes is exceeded, and once their
+    expiry in Redis may have passed. Hits are reported by pop_due at most once
+    per touch_interval seconds per entry, so that the caller refreshes the
+    expiry and LRU position of the entry in Redis.
+    Cached objects are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, touch_interval=10):
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        # value, size, expiry in seconds and time of the last refresh per key
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._due = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def sizeof(value, serialized_size):
+        """Approximate size of value in memory in bytes"""
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        return serialized_size
+
+    def get(self, hash_key, count=True):
+        """Returns the cached object or None, count toggles the hit/miss counters"""
+        with self._lock:
+            entry = self._entries.get(hash_key)
+            now = time.monotonic()
+            if (
+                entry is not None
+                and entry[2] is not None
+                and now >= entry[3] + entry[2]
+            ):
+                # the entry may have expired in Redis
+                del self._entries[hash_key]
+                self._bytes -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += count
+                return None
+            value, size, ttl, refreshed = entry
+            if now - refreshed >= self.touch_interval:
+                self._entries[hash_key] = (value, size, ttl, now)
+                self._due[hash_key] = ttl
+            self._entries.move_to_end(hash_key)
+            self.hits += count
+            return value
+
+    def put(self, hash_key, value, size, ttl=None):
+        """Caches value, whose entry in Redis was just refreshed and expires
+        after ttl seconds, None if it does not expire"""
+        if not self.max_bytes or size > self.max_bytes:
+            return
+        with self._lock:
+            if hash_key in self._entries:
+                self._entries.move_to_end(hash_key)
+                return
+            self._entries[hash_key] = (value, size, ttl, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def pop_due(self) -> dict:
+        """Returns the expiry per key of the entries that were hit
+        touch_interval seconds or more after their last refresh, which now
+        counts as refreshed"""
+        with self._lock:
+            due, self._due = self._due, {}
+            return due
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._due.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class MemoStats:
+    """Counters of the functions memoized with redis_store.memoize in this
+    process, per namespace. Waits are the calls that waited for another call
+    computing the same result."""
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self.waits = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, counter: Counter, namespace: str):
+        with self._lock:
+            counter[namespace] += 1
+
+    def clear(self):
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+            self.waits.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {}
+            for namespace in sorted(set(self.hits) | set(self.misses)):
+                hits, misses = self.hits[namespace], self.misses[namespace]
+                stats[namespace] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "waits": self.waits[namespace],
+                    "hit_rate": hits / (hits + misses),
+                }
+            return stats
+
+
+# result of a memoized function that is not stored (None is a valid result)
+_NOT_STORED = object()
+
+# errors of serializing a value that is not supported, e.g. by json or a codec
+_CODEC_ERRORS = (
+    ValueError,
+    TypeError,
+    AttributeError,
+    KeyError,
+    IndexError,
+    EOFError,
+    OSError,
+    ImportError,
+    NotImplementedError,
+    RecursionError,
+    pickle.PickleError,
+    struct.error,
+    zlib.error,
+)
+# errors of saving or loading a value, FileRedis raises those of sqlite3
+_STORE_ERRORS = _CODEC_ERRORS + (redis.RedisError, sqlite3.Error)
+
+
 class redis_store:
     """Save data to Redis using the hashed contents as the key.
     Serialize Pandas DataFrames as memory-efficient Parquet files.
 
+    Values that only consist of builtins and numpy arrays (e.g. dicts of
+    arrays or Plotly figure dicts) are pickled, with the array data out-of-band,
+    and restored with their types through an allowlist of globals.
+
     Otherwise, attempt to serialize the data as JSON, which may have a
     lossy conversion back to its original type. For example, numpy arrays will
     be deserialized as regular Python lists.
 
-    Connect to Redis with the environment variable `REDIS_URL` if available.
+    Each entry is stored as one Redis hash with the fields "type" and "value",
+    so that saving and loading take a single round trip. Entries written with
+    separate `_dash_aio_components_type_*`/`_value_*` keys can still be loaded.
+
+    The async_* methods do the same with redis.asyncio and their own
+    connection pool, for callbacks served from an async server. The memoize
+    decorator stores the results of expensive deterministic functions.
+
+    Connect to Redis with the environment variable `REDIS_URL` if available,
+    or the URL passed to configure. The connection is only made on first use.
+    URLs like `file:///var/cache/mpships` select FileRedis, which is shared by
+    the processes on one host without a Redis server.
     Otherwise, use FakeRedis, which is only suitable for development and
     will not scale across multiple processes.
     """
 
-    try:
-        r = redis.StrictRedis.from_url(
-            os.environ.get("REDIS_URL")
+    # Redis URL and ConnectionPool arguments, see configure
+    url = None
+    pool_kwargs: ClassVar[dict] = {
+        "max_connections": 50,
+        "socket_timeout": 10,
+        "socket_connect_timeout": 5,
+        "health_check_interval": 30,
+    }
+    # sync and redis.asyncio clients, created on first use
+    r = _LazyClient(lambda: redis_store._create_client())
+    async_r = _LazyClient(lambda: redis_store._create_async_client())
+    # shared by the FakeRedis clients
+    _fake_server = None
+    # expiry of the entries saved or loaded by this process, so that loads
+    # refresh it in the pipeline of their fetch; cleared when it is full
+    _entry_ttls: ClassVar[dict] = {}
+    _max_entry_ttls = 2**16
+
+    # codec of DataFrames, see CODECS
+    codec = "parquet-zstd"
+    # "pickle" or "json" for other values, see the class docstring
+    value_codec = "pickle"
+    # value and type of each entry are stored as the fields of one Redis hash,
+    # all keys of this namespace start with the prefix
+    prefix = "_dash_aio_components"
+    # expiry in seconds per type ("pd.DataFrame", "pickle", "json-serialized",
+    # "view"), default_ttl for other types; None for no expiry. The expiry is
+    # refreshed on every load and when identical content is saved again
+    ttl: ClassVar[dict] = {}
+    default_ttl = None
+    # budget for the size of all values of this namespace in bytes, the least
+    # recently used entries are evicted when it is exceeded; None for no limit.
+    # The bookkeeping for this is only done while it is set, so set it before
+    # saving the entries that count towards it
+    max_bytes = None
+    # DataFrames with more rows are stored in chunks of chunk_rows rows, which
+    # are encoded and uploaded one after another; None to store them whole
+    chunk_rows = None
+    # deserialized objects of recent loads in this process; a hit skips the
+    # fetch and only refreshes the entry in Redis every touch_interval seconds,
+    # set local_cache.max_bytes = 0 to disable it
+    local_cache = LocalCache()
+    # see memoize; memoized functions are always evaluated while memo_bypass is
+    # True, memo_stats counts their hits and misses in this process
+    memo_bypass = False
+    memo_stats = MemoStats()
+    # seconds that a call may hold the lock of a memoized result, others wait
+    # for it that long before they compute the result themselves
+    memo_lock_timeout = 60
+    memo_poll_interval = 0.05
+
+    @staticmethod
+    def configure(url=None, **pool_kwargs):
+        """Selects the Redis backend and the arguments of its ConnectionPool
+        (max_connections, socket_timeout, health_check_interval, ...).
+
+        If url is None, REDIS_URL, MP_REDIS_URL or mp_web's REDIS_ADDRESS is
+        used. URLs that redis cannot connect to, e.g. "fakeredis://", select
+        FakeRedis. The clients are created again on their next use.
+        """
+        redis_store.url = url
+        redis_store.pool_kwargs = {**redis_store.pool_kwargs, **pool_kwargs}
+        redis_store._fake_server = None
+        redis_store._entry_ttls.clear()
+        redis_store._reset_clients()
+
+    @staticmethod
+    def _reset_clients():
+        # the descriptors, not the clients they return
+        vars(redis_store)["r"].reset()
+        vars(redis_store)["async_r"].reset()
+
+    @staticmethod
+    def _url() -> str:
+        url = (
+            redis_store.url
+            or os.environ.get("REDIS_URL")
             or os.environ.get("MP_REDIS_URL")
-            or SETTINGS.REDIS_ADDRESS
         )
-    except ValueError:
+        if not url:
+            from mp_web.settings import SETTINGS
+
+            url = SETTINGS.REDIS_ADDRESS
+        return url
+
+    @staticmethod
+    def _fake():
         warnings.warn("Using FakeRedis - Not suitable for Production Use.")
-        r = fakeredis.FakeStrictRedis()
+        if redis_store._fake_server is None:
+            redis_store._fake_server = fakeredis.FakeServer()
+        return redis_store._fake_server
+
+    @staticmethod
+    def _create_client():
+        if redis_store._url().startswith("file://"):
+            return FileRedis.from_url(redis_store._url())
+        try:
+            pool = redis.ConnectionPool.from_url(
+                redis_store._url(), **redis_store.pool_kwargs
+            )
+        except ValueError:
+            return fakeredis.FakeStrictRedis(server=redis_store._fake())
+        return redis.StrictRedis(connection_pool=pool)
+
+    @staticmethod
+    def _create_async_client():
+        if redis_store._url().startswith("file://"):
+            return AsyncFileRedis(FileRedis.from_url(redis_store._url()))
+        try:
+            pool = redis.asyncio.ConnectionPool.from_url(
+                redis_store._url(), **redis_store.pool_kwargs
+            )
+        except ValueError:
+            return fakeredis.FakeAsyncRedis(server=redis_store._fake())
+        return redis.asyncio.Redis(connection_pool=pool)
 
     @staticmethod
     def _hash(serialized_obj: bytes) -> str:
         return hashlib.sha512(serialized_obj).hexdigest()
 
     @staticmethod
-    def save(value):
+    def _key(hash_key: str) -> str:
+        return f"{redis_store.prefix}_entry_{hash_key}"
+
+    @staticmethod
+    def _legacy_keys(hash_key: str) -> list:
+        """separate value and type keys, as written before entries were stored as hashes"""
+        return [
+            f"{redis_store.prefix}_type_{hash_key}",
+            f"{redis_store.prefix}_value_{hash_key}",
+        ]
+
+    @staticmethod
+    def _fingerprint_key(fingerprint: str, codec: str) -> str:
+        return f"{redis_store.prefix}_fingerprint_{codec}_{fingerprint}"
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame):
+        """Fast fingerprint of a DataFrame's contents, calculated before serialization.
+
+        Returns None if the DataFrame cannot be hashed by pandas (e.g. lists in cells),
+        or if object columns hold other values than builtin scalars.
+        """
+        try:
+            row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+        except TypeError:
+            return None
+        # pandas hashes objects by their string, so that e.g. 1 and "1" are only
+        # told apart by the hashes of their types
+        type_hashes = []
+        arrays = [df.iloc[:, i] for i in range(df.shape[1])] + [
+            df.index.get_level_values(i) for i in range(df.index.nlevels)
+        ]
+        for array in arrays:
+            if array.dtype == object:
+                types = [type(value) for value in array]
+                if not set(types) <= _PLAIN_TYPES:
+                    return None
+                type_hashes.append(
+                    pd.util.hash_array(np.array([t.__name__ for t in types], object))
+                )
+        header = json.dumps(
+            [
+                [repr(name) for name in df.columns],
+                [repr(dtype) for dtype in df.dtypes],
+                type(df.columns).__name__,
+                [repr(name) for name in df.index.names],
+                type(df.index).__name__,
+                repr(df.index.dtype),
+            ]
+        ).encode("utf-8")
+        return hashlib.blake2b(
+            header + row_hashes.tobytes() + b"".join(h.tobytes() for h in type_hashes)
+        ).hexdigest()
+
+    @staticmethod
+    def _ttl(obj_type: str, ttl=None):
+        """ttl if it is given, else the expiry of obj_type"""
+        if ttl is not None:
+            return ttl
+        return redis_store.ttl.get(obj_type, redis_store.default_ttl)
+
+    @staticmethod
+    def _remember_ttl(hash_key, ttl):
+        if len(redis_store._entry_ttls) >= redis_store._max_entry_ttls:
+            redis_store._entry_ttls.clear()
+        redis_store._entry_ttls[hash_key] = ttl
+
+    @staticmethod
+    def _stale_ttl(hash_key, ttl):
+        """Returns the expiry of the entry of hash_key, with ttl as fetched, if
+        _queue_fetch did not refresh it, else None"""
+        queued = redis_store._entry_ttls.get(hash_key)
+        redis_store._remember_ttl(hash_key, ttl)
+        return ttl if ttl != queued else None
+
+    @staticmethod
+    def _lru_key() -> str:
+        """sorted set of the hash keys of this namespace, scored by their last use"""
+        return f"{redis_store.prefix}_lru"
+
+    @staticmethod
+    def _sizes_key() -> str:
+        """hash of the value size per hash key, with the total size in the field total"""
+        return f"{redis_store.prefix}_sizes"
+
+    @staticmethod
+    def _fingerprints_key() -> str:
+        """hash of the fingerprint key per hash key, deleted with the entry"""
+        return f"{redis_store.prefix}_fingerprints"
+
+    @staticmethod
+    def _touch(pipe, hash_key, ttl, *keys):
+        """Refreshes the expiry of keys and marks hash_key as recently used"""
+        if ttl is not None:
+            for key in keys:
+                pipe.expire(key, ttl)
+        if redis_store.max_bytes is not None:
+            pipe.zadd(redis_store._lru_key(), {hash_key: time.time()}, xx=True)
+
+    @staticmethod
+    def _queue_inspect(pipe, oldest):
+        """Queues the lookup of the sizes, fingerprint keys and existence of the
+        entries of the hash keys oldest, see _select_evicted"""
+        pipe.hmget(redis_store._sizes_key(), oldest)
+        pipe.hmget(redis_store._fingerprints_key(), oldest)
+        for hash_key in oldest:
+            pipe.exists(redis_store._key(hash_key.decode("utf-8")))
+
+    @staticmethod
+    def _select_evicted(oldest, results, total):
+        """Returns the hash keys to delete, their fingerprint keys and their size.
+
+        Entries that expired are always dropped from the bookkeeping. The least
+        recently used of the others are evicted until the namespace fits.
+        """
+        sizes, fingerprint_keys, *exists = results
+        sizes = [int(size or 0) for size in sizes]
+        selected = {i for i, exist in enumerate(exists) if not exist}
+        freed = sum(sizes[i] for i in selected)
+        for i, size in enumerate(sizes):
+            if total - freed <= redis_store.max_bytes:
+                break
+            if i not in selected:
+                selected.add(i)
+                freed += size
+        selected = sorted(selected)
+        return (
+            [oldest[i].decode("utf-8") for i in selected],
+            [fingerprint_keys[i] for i in selected if fingerprint_keys[i]],
+            freed,
+        )
+
+    @staticmethod
+    def _queue_delete(pipe, hash_keys, fingerprint_keys, freed):
+        pipe.delete(
+            *[redis_store._key(hash_key) for hash_key in hash_keys], *fingerprint_keys
+        )
+        pipe.zrem(redis_store._lru_key(), *hash_keys)
+        pipe.hdel(redis_store._fingerprints_key(), *hash_keys)
+        pipe.hdel(redis_store._sizes_key(), *hash_keys)
+        pipe.hincrby(redis_store._sizes_key(), "total", -freed)
+
+    @staticmethod
+    def _evict():
+        """Deletes the least recently used entries until the namespace fits into
+        max_bytes.
+
+        Entries that expired are dropped from the bookkeeping on the way. With
+        the sliding expiry, they are the least recently used ones if all types
+        share one ttl.
+        """
+        r = redis_store.r
+        total = int(r.hget(redis_store._sizes_key(), "total") or 0)
+        while redis_store.max_bytes is not None and total > redis_store.max_bytes:
+            oldest = r.zrange(redis_store._lru_key(), 0, 15)
+            if not oldest:
+                break
+            pipe = r.pipeline(transaction=False)
+            redis_store._queue_inspect(pipe, oldest)
+            hash_keys, fingerprint_keys, freed = redis_store._select_evicted(
+                oldest, pipe.execute(), total
+            )
+            pipe = r.pipeline()
+            redis_store._queue_delete(pipe, hash_keys, fingerprint_keys, freed)
+            total = pipe.execute()[-1]
+            logger.info(f"Evicted or dropped {len(hash_keys)} entries ({freed} bytes)")
+
+    @staticmethod
+    def _serialize(value, codec):
+        """Returns hash key, type and serialized value of value"""
         if isinstance(value, pd.DataFrame):
-            buffer = io.BytesIO()
-            value.to_parquet(buffer, compression="gzip")
-            buffer.seek(0)
-            df_as_bytes = buffer.read()
-            hash_key = redis_store._hash(df_as_bytes)
-            obj_type = "pd.DataFrame"
-            serialized_value = df_as_bytes
+            encode, _ = CODECS[codec]
+            df_as_bytes = encode(value)
+            return redis_store._hash(df_as_bytes), "pd.DataFrame", df_as_bytes
+        if redis_store.value_codec == "pickle" and _is_plain(value):
+            serialized_value = _pickle_dumps(value)
+            return redis_store._hash(serialized_value), "pickle", serialized_value
+        serialized_value = json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder).encode(
+            "utf-8"
+        )
+        return redis_store._hash(serialized_value), "json-serialized", serialized_value
+
+    @staticmethod
+    def _queue_write(pipe, hash_key, obj_type, serialized_value, codec, ttl):
+        """Queues writing the entry of hash_key on a transaction, the first result
+        is falsy if another process was faster"""
+        key = redis_store._key(hash_key)
+        pipe.hsetnx(key, "value", serialized_value)
+        pipe.hsetnx(key, "type", obj_type)
+        if obj_type == "pd.DataFrame":
+            pipe.hsetnx(key, "codec", codec)
+        if ttl is not None:
+            # the expiry is stored with the entry for the refresh on load
+            pipe.hsetnx(key, "ttl", ttl)
+            pipe.expire(key, ttl)
+
+    @staticmethod
+    def _queue_added(pipe, hash_key, size):
+        """Queues the bookkeeping of a new entry for the LRU eviction"""
+        if redis_store.max_bytes is None:
+            return
+        pipe.zadd(redis_store._lru_key(), {hash_key: time.time()})
+        pipe.hset(redis_store._sizes_key(), hash_key, size)
+        pipe.hincrby(redis_store._sizes_key(), "total", size)
+
+    @staticmethod
+    def _queue_fingerprint(pipe, fingerprint_key, hash_key, ttl):
+        pipe.set(fingerprint_key, hash_key, ex=ttl)
+        if redis_store.max_bytes is not None:
+            pipe.hset(redis_store._fingerprints_key(), hash_key, fingerprint_key)
+
+    @staticmethod
+    def save(value, return_hit=False, codec=None, chunk_rows=None, ttl=None):
+        """Saves value and returns its hash key.
+
+        DataFrames are serialized with codec (see CODECS), redis_store.codec
+        by default, in chunks of chunk_rows rows (redis_store.chunk_rows
+        by default) if they are larger. The entry expires after ttl seconds,
+        by default after the expiry of its type (see redis_store.ttl).
+
+        Content that is already stored is not uploaded again. For DataFrames,
+        this is detected from their fingerprint before serialization.
+        If return_hit is True, (hash_key, hit) is returned, where hit is True
+        if the content was already stored.
+        """
+        codec = codec or redis_store.codec
+        chunk_rows = chunk_rows or redis_store.chunk_rows
+        fingerprint = None
+        if isinstance(value, pd.DataFrame):
+            fingerprint = redis_store.fingerprint(value)
+        if fingerprint is not None:
+            fingerprint_key = redis_store._fingerprint_key(fingerprint, codec)
+            hash_key = redis_store.r.get(fingerprint_key)
+            if hash_key is not None:
+                hash_key = hash_key.decode("utf-8")
+                pipe = redis_store.r.pipeline(transaction=False)
+                pipe.exists(redis_store._key(hash_key))
+                redis_store._touch(
+                    pipe,
+                    hash_key,
+                    redis_store._ttl("pd.DataFrame", ttl),
+                    redis_store._key(hash_key),
+                    fingerprint_key,
+                )
+                if pipe.execute()[0]:
+                    return (hash_key, True) if return_hit else hash_key
+
+        if (
+            isinstance(value, pd.DataFrame)
+            and chunk_rows is not None
+            and len(value) > chunk_rows
+        ):
+            ttl = redis_store._ttl("pd.DataFrame", ttl)
+            hash_key, hit, size = redis_store._save_chunks(
+                value, codec, chunk_rows, ttl
+            )
         else:
-            serialized_value = json.dumps(
-                value, cls=plotly.utils.PlotlyJSONEncoder
-            ).encode("utf-8")
-            hash_key = redis_store._hash(serialized_value)
-            obj_type = "json-serialized"
+            hash_key, obj_type, serialized_value = redis_store._serialize(value, codec)
+            ttl = redis_store._ttl(obj_type, ttl)
+            hit = redis_store._store(hash_key, obj_type, serialized_value, codec, ttl)
+            size = len(serialized_value)
+        if not hit:
+            redis_store._added(hash_key, size)
+        redis_store._remember_ttl(hash_key, ttl)
+        if fingerprint is not None:
+            pipe = redis_store.r.pipeline()
+            redis_store._queue_fingerprint(pipe, fingerprint_key, hash_key, ttl)
+            pipe.execute()
+        return (hash_key, hit) if return_hit else hash_key
+
+    @staticmethod
+    def _store(hash_key, obj_type, serialized_value, codec, ttl) -> bool:
+        """Writes the entry of hash_key and returns True if it was already stored"""
+        key = redis_store._key(hash_key)
+        # skip the upload if this content is already stored
+        pipe = redis_store.r.pipeline(transaction=False)
+        pipe.exists(key)
+        redis_store._touch(pipe, hash_key, ttl, key)
+        if pipe.execute()[0]:
+            return True
+        # value and type are written together, unless another process was faster
+        pipe = redis_store.r.pipeline()
+        redis_store._queue_write(pipe, hash_key, obj_type, serialized_value, codec, ttl)
+        return not pipe.execute()[0]
+
+    @staticmethod
+    def _added(hash_key, size):
+        if redis_store.max_bytes is None:
+            return
+        pipe = redis_store.r.pipeline()
+        redis_store._queue_added(pipe, hash_key, size)
+        pipe.execute()
+        redis_store._evict()
+
+    @staticmethod
+    def save_view(parent_hash, rows, return_hit=False):
+        """Saves a view of the rows of the DataFrame saved with parent_hash and
+        returns its hash key; rows are non-negative positions or a boolean mask.
+
+        Only the parent's hash key and a compressed bitmap of the rows are
+        stored. load resolves the view with iloc on the parent, so the rows are
+        returned in the parent's order and without duplicates.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            mask = rows
+        else:
+            if len(rows) and rows.min() < 0:
+                raise ValueError("row positions of views must not be negative")
+            mask = np.zeros(rows.max() + 1 if len(rows) else 0, dtype=bool)
+            mask[rows] = True
+        # trailing unselected rows are dropped, so that the same selection as
+        # positions or as a mask is saved as the same entry
+        mask = mask[: np.flatnonzero(mask)[-1] + 1 if mask.any() else 0]
+        if not redis_store.r.exists(
+            redis_store._key(parent_hash), *redis_store._legacy_keys(parent_hash)
+        ):
+            raise KeyError(f"No entry for the parent hash {parent_hash}")
+        serialized_value = (
+            parent_hash.encode("utf-8") + b":" + zlib.compress(np.packbits(mask))
+        )
+        hash_key = redis_store._hash(serialized_value)
+        hit = redis_store._store(
+            hash_key, "view", serialized_value, None, redis_store._ttl("view")
+        )
+        if not hit:
+            redis_store._added(hash_key, len(serialized_value))
+        return (hash_key, hit) if return_hit else hash_key
+
+    @staticmethod
+    def _resolve_view(serialized_value, columns=None) -> pd.DataFrame:
+        """Loads the rows of the parent DataFrame of a view"""
+        parent_hash, bitmap = serialized_value.split(b":", 1)
+        rows = np.flatnonzero(
+            np.unpackbits(np.frombuffer(zlib.decompress(bitmap), dtype=np.uint8))
+        )
+        return redis_store.load(parent_hash.decode("utf-8"), columns).iloc[rows]
+
+    @staticmethod
+    def _save_chunks(df: pd.DataFrame, codec: str, chunk_rows: int, ttl):
+        """Uploads df in chunks as fields chunk_0, chunk_1, ... of one entry and
+        returns (hash_key, hit, size). Only one encoded chunk is held in memory.
+
+        The hash key is only known after the last chunk, so the chunks are
+        written to a temporary key, which is renamed at the end.
+        """
+        encode, _ = CODECS[codec]
+        tmp_key = redis_store._key(f"tmp_{uuid.uuid4().hex}")
+        digest = hashlib.sha512()
+        size = 0
+        chunks = 0
+        try:
+            for start in range(0, len(df), chunk_rows):
+                chunk = encode(df.iloc[start : start + chunk_rows])
+                digest.update(chunk)
+                pipe = redis_store.r.pipeline(transaction=False)
+                pipe.hset(tmp_key, f"chunk_{chunks}", chunk)
+                # left behind if this process dies before the rename
+                pipe.expire(tmp_key, 3600)
+                pipe.execute()
+                size += len(chunk)
+                chunks += 1
+            hash_key = digest.hexdigest()
+            mapping = {"type": "pd.DataFrame", "codec": codec, "chunks": chunks}
+            pipe = redis_store.r.pipeline()
+            if ttl is not None:
+                mapping["ttl"] = ttl
+                pipe.expire(tmp_key, ttl)
+            else:
+                pipe.persist(tmp_key)
+            pipe.hset(tmp_key, mapping=mapping)
+            pipe.renamenx(tmp_key, redis_store._key(hash_key))
+            hit = not pipe.execute()[-1]
+        finally:
+            # still exists if the upload failed or the content was already stored
+            redis_store.r.delete(tmp_key)
+        return hash_key, hit, size
+
+    @staticmethod
+    def _queue_fetch(pipe, hash_key):
+        # one round trip, including the lookup of entries saved with the legacy
+        # keys and the sliding expiry if this process knows it, see _stale_ttl
+        key = redis_store._key(hash_key)
+        pipe.hmget(key, ["type", "value", "ttl", "codec", "chunks"])
+        pipe.mget(redis_store._legacy_keys(hash_key))
+        redis_store._touch(pipe, hash_key, redis_store._entry_ttls.get(hash_key), key)
+
+    @staticmethod
+    def _parse_fetch(hash_key, results):
+        """Returns type, serialized value, expiry, codec id and number of chunks
+        from the results of _queue_fetch. The value is None for entries saved in
+        chunks, and the number of chunks None for others."""
+        (data_type, serialized_value, ttl, codec, chunks), legacy = results[:2]
+        if serialized_value is None and chunks is None:
+            data_type, serialized_value = legacy
+        if serialized_value is None and chunks is None:
+            message = f"No entry for hash {hash_key}, it has expired, was evicted or was never saved"
+            logger.error(message)
+            raise KeyError(message)
+        # entries without codec were written as gzip Parquet
+        codec = codec.decode("utf-8") if codec else "parquet-gzip"
+        return (
+            data_type,
+            serialized_value,
+            ttl and int(ttl),
+            codec,
+            chunks and int(chunks),
+        )
+
+    @staticmethod
+    def _fetch(hash_key):
+        """Returns type, serialized value, expiry, codec id and number of chunks
+        of the entry of hash_key, see _parse_fetch."""
+        pipe = redis_store.r.pipeline(transaction=False)
+        redis_store._queue_fetch(pipe, hash_key)
+        entry = redis_store._parse_fetch(hash_key, pipe.execute())
+        ttl = redis_store._stale_ttl(hash_key, entry[2])
+        if ttl is not None:
+            # first load of the entry in this process
+            redis_store.r.expire(redis_store._key(hash_key), ttl)
+        return entry
 
-        redis_store.r.set(f"_dash_aio_components_value_{hash_key}", serialized_value)
-        redis_store.r.set(f"_dash_aio_components_type_{hash_key}", obj_type)
-        return hash_key
+    @staticmethod
+    def _missing_chunk(hash_key):
+        message = f"Entry for hash {hash_key} expired or was evicted while loading"
+        logger.error(message)
+        return KeyError(message)
+
+    @staticmethod
+    def _decode_chunks(hash_key, chunks, decode):
+        """Fetches and decodes the chunks of the entry of hash_key one by one"""
+        key = redis_store._key(hash_key)
+        for i in range(chunks):
+            chunk = redis_store.r.hget(key, f"chunk_{i}")
+            if chunk is None:
+                raise redis_store._missing_chunk(hash_key)
+            yield decode(chunk)
 
     @staticmethod
-    def load(hash_key):
-        data_type = redis_store.r.get(f"_dash_aio_components_type_{hash_key}")
-        serialized_value = redis_store.r.get(f"_dash_aio_components_value_{hash_key}")
+    def _decode(hash_key, data_type, serialized_value, codec, columns):
+        """Deserializes a value that was not saved in chunks"""
         try:
-            return (
-                pd.read_parquet(io.BytesIO(serialized_value))
-                if data_type == b"pd.DataFrame"
-                else json.loads(serialized_value)
-            )
-        except Exception as e:
+            if data_type == b"pd.DataFrame":
+                _, decode = CODECS[codec]
+                return decode(serialized_value, columns=columns)
+            if data_type == b"view":
+                return redis_store._resolve_view(serialized_value, columns)
+            if columns is not None:
+                raise TypeError("columns can only be loaded from DataFrames")
+            if data_type == b"pickle":
+                return _pickle_loads(serialized_value)
+            return json.loads(serialized_value)
+        except _CODEC_ERRORS as e:
             logger.error(f"{e}\nERROR LOADING {data_type} (hash {hash_key})")
             raise e
+
+    @staticmethod
+    def _queue_local_touches(pipe):
+        """Queues the refresh of the entries that were loaded from the
+        local_cache, see LocalCache.pop_due"""
+        for cache_key, ttl in redis_store.local_cache.pop_due().items():
+            hash_key = cache_key if isinstance(cache_key, str) else cache_key[0]
+            redis_store._touch(pipe, hash_key, ttl, redis_store._key(hash_key))
+
+    @staticmethod
+    def _touch_local():
+        pipe = redis_store.r.pipeline(transaction=False)
+        redis_store._queue_local_touches(pipe)
+        if pipe.command_stack:
+            pipe.execute(raise_on_error=False)
+
+    @staticmethod
+    def _cached(hash_key, columns):
+        """Returns the cache key and the value from the local cache or None"""
+        cache_key = hash_key if columns is None else (hash_key, tuple(columns))
+        value = redis_store.local_cache.get(cache_key)
+        if value is None and columns is not None:
+            # project the whole DataFrame if it is cached already
+            value = redis_store.local_cache.get(hash_key, count=False)
+            if value is not None:
+                value = value[list(columns)]
+        return cache_key, value
+
+    @staticmethod
+    def load(hash_key, columns=None):
+        """Loads the value saved with hash_key.
+
+        For DataFrames, only the given columns are decoded if columns is not None.
+        Recently loaded values are returned from the in-process local_cache
+        and must be treated as read-only.
+        """
+        cache_key, value = redis_store._cached(hash_key, columns)
+        if value is not None:
+            redis_store._touch_local()
+            return value
+        columns = None if columns is None else list(columns)
+        data_type, serialized_value, ttl, codec, chunks = redis_store._fetch(hash_key)
+        if chunks is None:
+            value = redis_store._decode(
+                hash_key, data_type, serialized_value, codec, columns
+            )
+        else:
+            _, decode = CODECS[codec]
+            value = pd.concat(
+                redis_store._decode_chunks(
+                    hash_key, chunks, lambda chunk: decode(chunk, columns=columns)
+                )
+            )
+        redis_store.local_cache.put(
+            cache_key,
+            value,
+            LocalCache.sizeof(value, len(serialized_value or b"")),
+            ttl,
+        )
+        return value
+
+    @staticmethod
+    def load_chunks(hash_key, columns=None):
+        """Yields the DataFrame saved with hash_key in the chunks it was saved in,
+        fetching one chunk at a time. DataFrames saved whole are yielded at once.
+        """
+        data_type, serialized_value, _, codec, chunks = redis_store._fetch(hash_key)
+        if data_type == b"view":
+            yield redis_store._resolve_view(serialized_value, columns)
+            return
+        if data_type != b"pd.DataFrame":
+            raise TypeError("only DataFrames can be loaded in chunks")
+        _, decode = CODECS[codec]
+        if chunks is None:
+            yield decode(serialized_value, columns=columns)
+        else:
+            yield from redis_store._decode_chunks(
+                hash_key, chunks, lambda chunk: decode(chunk, columns=columns)
+            )
+
+    @staticmethod
+    def load_filtered(hash_key, ranges: dict) -> pd.DataFrame:
+        """Loads the rows of a DataFrame where lo <= column <= hi for all
+        column: (lo, hi) in ranges.
+
+        For Parquet codecs, row groups whose column statistics lie outside
+        the ranges are not decoded.
+        """
+        value = redis_store.local_cache.get(hash_key)
+        if value is not None:
+            redis_store._touch_local()
+        else:
+            data_type, serialized_value, _, codec, chunks = redis_store._fetch(hash_key)
+            if data_type == b"view":
+                value = redis_store._resolve_view(serialized_value)
+                return value[_range_mask(value, ranges)]
+            if data_type != b"pd.DataFrame":
+                raise TypeError("only DataFrames can be loaded filtered")
+            if codec.startswith("parquet"):
+                filters = []
+                for column, (lo, hi) in ranges.items():
+                    filters += [(column, ">=", lo), (column, "<=", hi)]
+
+                def decode(serialized_value):
+                    return _read_parquet_filtered(serialized_value, filters)
+
+            else:
+                _, decode = CODECS[codec]
+            if chunks is None:
+                value = decode(serialized_value)
+            else:
+                # chunks are filtered one by one
+                value = pd.concat(
+                    chunk[_range_mask(chunk, ranges)]
+                    for chunk in redis_store._decode_chunks(hash_key, chunks, decode)
+                )
+        # exact filter, as whole row groups may be read
+        return value[_range_mask(value, ranges)]
+
+    @staticmethod
+    def save_many(values, codec=None) -> list:
+        """Saves all values and returns their hash keys in the same order.
+
+        The values are serialized in a thread pool and uploaded in one pipeline.
+        If an item fails, its exception is returned in its place instead of
+        aborting the batch. DataFrames larger than redis_store.chunk_rows are
+        saved one by one with save.
+        """
+        codec = codec or redis_store.codec
+        chunk_rows = redis_store.chunk_rows
+        results = [None] * len(values)
+        serialized = {}
+        with ThreadPoolExecutor() as executor:
+            futures = {}
+            for i, value in enumerate(values):
+                if (
+                    isinstance(value, pd.DataFrame)
+                    and chunk_rows is not None
+                    and len(value) > chunk_rows
+                ):
+                    continue
+                futures[i] = executor.submit(redis_store._serialize, value, codec)
+            for i, future in futures.items():
+                try:
+                    serialized[i] = future.result()
+                except _CODEC_ERRORS as e:
+                    logger.error(f"{e}\nERROR SAVING item {i}")
+                    results[i] = e
+        for i, value in enumerate(values):
+            if i not in futures:
+                try:
+                    results[i] = redis_store.save(value, codec=codec)
+                except _STORE_ERRORS as e:
+                    results[i] = e
+
+        # skip the upload of content that is already stored
+        pipe = redis_store.r.pipeline(transaction=False)
+        positions = {}
+        for i, (hash_key, obj_type, _) in serialized.items():
+            key = redis_store._key(hash_key)
+            positions[i] = len(pipe.command_stack)
+            pipe.exists(key)
+            redis_store._touch(pipe, hash_key, redis_store._ttl(obj_type), key)
+        exists = pipe.execute(raise_on_error=False) if serialized else []
+        pipe = redis_store.r.pipeline()
+        new = {}
+        for i, (hash_key, obj_type, serialized_value) in serialized.items():
+            hit = exists[positions[i]]
+            if isinstance(hit, Exception):
+                results[i] = hit
+                continue
+            results[i] = hash_key
+            if not hit:
+                new[i] = len(pipe.command_stack)
+                redis_store._queue_write(
+                    pipe,
+                    hash_key,
+                    obj_type,
+                    serialized_value,
+                    codec,
+                    redis_store._ttl(obj_type),
+                )
+        written = pipe.execute(raise_on_error=False) if new else []
+
+        pipe = redis_store.r.pipeline()
+        for i, position in new.items():
+            # result of the hsetnx of the value, falsy if another process was faster
+            result = written[position]
+            if isinstance(result, Exception):
+                results[i] = result
+            elif result:
+                hash_key, _, serialized_value = serialized[i]
+                redis_store._queue_added(pipe, hash_key, len(serialized_value))
+        if pipe.command_stack:
+            pipe.execute()
+            if redis_store.max_bytes is not None:
+                redis_store._evict()
+        return results
+
+    @staticmethod
+    def load_many(hash_keys, columns=None) -> list:
+        """Loads the values of all hash keys in the same order.
+
+        Entries are fetched in one pipeline and deserialized in a thread pool.
+        If an item fails, e.g. with a KeyError if it expired, its exception is
+        returned in its place instead of aborting the batch.
+        """
+        results = [None] * len(hash_keys)
+        cache_keys = {}
+        positions = {}
+        pipe = redis_store.r.pipeline(transaction=False)
+        for i, hash_key in enumerate(hash_keys):
+            cache_keys[i], results[i] = redis_store._cached(hash_key, columns)
+            if results[i] is None:
+                positions[i] = len(pipe.command_stack)
+                redis_store._queue_fetch(pipe, hash_key)
+        redis_store._queue_local_touches(pipe)
+        fetched = pipe.execute(raise_on_error=False) if pipe.command_stack else []
+        columns = None if columns is None else list(columns)
+
+        entries = {}
+        pipe = redis_store.r.pipeline(transaction=False)
+        for i, position in positions.items():
+            # the hmget and mget of _queue_fetch
+            entry_results = fetched[position : position + 2]
+            try:
+                for result in entry_results:
+                    if isinstance(result, Exception):
+                        raise result
+                entries[i] = redis_store._parse_fetch(hash_keys[i], entry_results)
+            except (KeyError, redis.RedisError, sqlite3.Error) as e:
+                results[i] = e
+                continue
+            ttl = redis_store._stale_ttl(hash_keys[i], entries[i][2])
+            if ttl is not None:
+                # first load of the entry in this process
+                pipe.expire(redis_store._key(hash_keys[i]), ttl)
+        if pipe.command_stack:
+            pipe.execute(raise_on_error=False)
+
+        def decode(i):
+            data_type, serialized_value, ttl, codec, chunks = entries[i]
+            if chunks is not None:
+                return redis_store.load(hash_keys[i], columns)
+            value = redis_store._decode(
+                hash_keys[i], data_type, serialized_value, codec, columns
+            )
+            redis_store.local_cache.put(
+                cache_keys[i],
+                value,
+                LocalCache.sizeof(value, len(serialized_value)),
+                ttl,
+            )
+            return value
+
+        with ThreadPoolExecutor() as executor:
+            futures = {i: executor.submit(decode, i) for i in entries}
+            for i, future in futures.items():
+                try:
+                    results[i] = future.result()
+                except _STORE_ERRORS as e:
+                    results[i] = e
+        return results
+
+    @staticmethod
+    async def _async_evict():
+        r = redis_store.async_r
+        total = int(await r.hget(redis_store._sizes_key(), "total") or 0)
+        while redis_store.max_bytes is not None and total > redis_store.max_bytes:
+            oldest = await r.zrange(redis_store._lru_key(), 0, 15)
+            if not oldest:
+                break
+            pipe = r.pipeline(transaction=False)
+            redis_store._queue_inspect(pipe, oldest)
+            hash_keys, fingerprint_keys, freed = redis_store._select_evicted(
+                oldest, await pipe.execute(), total
+            )
+            pipe = r.pipeline()
+            redis_store._queue_delete(pipe, hash_keys, fingerprint_keys, freed)
+            total = (await pipe.execute())[-1]
+            logger.info(f"Evicted or dropped {len(hash_keys)} entries ({freed} bytes)")
+
+    @staticmethod
+    async def async_save(value, return_hit=False, codec=None):
+        """Like save, without blocking on Redis. Serialization runs in a worker
+        thread; DataFrames are always saved whole."""
+        r = redis_store.async_r
+        codec = codec or redis_store.codec
+        fingerprint = None
+        if isinstance(value, pd.DataFrame):
+            fingerprint = redis_store.fingerprint(value)
+        if fingerprint is not None:
+            fingerprint_key = redis_store._fingerprint_key(fingerprint, codec)
+            hash_key = await r.get(fingerprint_key)
+            if hash_key is not None:
+                hash_key = hash_key.decode("utf-8")
+                pipe = r.pipeline(transaction=False)
+                pipe.exists(redis_store._key(hash_key))
+                redis_store._touch(
+                    pipe,
+                    hash_key,
+                    redis_store._ttl("pd.DataFrame"),
+                    redis_store._key(hash_key),
+                    fingerprint_key,
+                )
+                if (await pipe.execute())[0]:
+                    return (hash_key, True) if return_hit else hash_key
+
+        hash_key, obj_type, serialized_value = await asyncio.to_thread(
+            redis_store._serialize, value, codec
+        )
+        key = redis_store._key(hash_key)
+        ttl = redis_store._ttl(obj_type)
+        pipe = r.pipeline(transaction=False)
+        pipe.exists(key)
+        redis_store._touch(pipe, hash_key, ttl, key)
+        hit = bool((await pipe.execute())[0])
+        if not hit:
+            pipe = r.pipeline()
+            redis_store._queue_write(
+                pipe, hash_key, obj_type, serialized_value, codec, ttl
+            )
+            hit = not (await pipe.execute())[0]
+        if not hit and redis_store.max_bytes is not None:
+            pipe = r.pipeline()
+            redis_store._queue_added(pipe, hash_key, len(serialized_value))
+            await pipe.execute()
+            await redis_store._async_evict()
+        redis_store._remember_ttl(hash_key, ttl)
+        if fingerprint is not None:
+            pipe = r.pipeline()
+            redis_store._queue_fingerprint(pipe, fingerprint_key, hash_key, ttl)
+            await pipe.execute()
+        return (hash_key, hit) if return_hit else hash_key
+
+    @staticmethod
+    async def async_load(hash_key, columns=None):
+        """Like load, without blocking on Redis. Deserialization runs in a
+        worker thread."""
+        r = redis_store.async_r
+        cache_key, value = redis_store._cached(hash_key, columns)
+        if value is not None:
+            pipe = r.pipeline(transaction=False)
+            redis_store._queue_local_touches(pipe)
+            if pipe.command_stack:
+                await pipe.execute(raise_on_error=False)
+            return value
+        columns = None if columns is None else list(columns)
+        pipe = r.pipeline(transaction=False)
+        redis_store._queue_fetch(pipe, hash_key)
+        data_type, serialized_value, ttl, codec, chunks = redis_store._parse_fetch(
+            hash_key, await pipe.execute()
+        )
+        stale_ttl = redis_store._stale_ttl(hash_key, ttl)
+        if stale_ttl is not None:
+            # first load of the entry in this process
+            await r.expire(redis_store._key(hash_key), stale_ttl)
+        if chunks is None:
+            value = await asyncio.to_thread(
+                redis_store._decode,
+                hash_key,
+                data_type,
+                serialized_value,
+                codec,
+                columns,
+            )
+        else:
+            _, decode = CODECS[codec]
+            values = []
+            for i in range(chunks):
+                chunk = await r.hget(redis_store._key(hash_key), f"chunk_{i}")
+                if chunk is None:
+                    raise redis_store._missing_chunk(hash_key)
+                values.append(await asyncio.to_thread(decode, chunk, columns))
+            value = pd.concat(values)
+        redis_store.local_cache.put(
+            cache_key,
+            value,
+            LocalCache.sizeof(value, len(serialized_value or b"")),
+            ttl,
+        )
+        return value
+
+    @staticmethod
+    async def async_save_many(values, codec=None) -> list:
+        """Saves all values concurrently and returns their hash keys"""
+        return await asyncio.gather(
+            *[redis_store.async_save(value, codec=codec) for value in values]
+        )
+
+    @staticmethod
+    async def async_load_many(hash_keys, columns=None) -> list:
+        """Loads the values of all hash keys concurrently"""
+        return await asyncio.gather(
+            *[redis_store.async_load(hash_key, columns) for hash_key in hash_keys]
+        )
+
+    @staticmethod
+    def _memo_key(namespace: str, version, args_hash: str) -> str:
+        return f"{redis_store.prefix}_memo_{namespace}_{version}_{args_hash}"
+
+    @staticmethod
+    def _memo_lookup(memo_key):
+        """Returns a copy of the memoized result or _NOT_STORED"""
+        hash_key = redis_store.r.get(memo_key)
+        if hash_key is None:
+            return _NOT_STORED
+        try:
+            # loaded values are shared through the local_cache
+            return copy.deepcopy(redis_store.load(hash_key.decode("utf-8")))
+        except KeyError:
+            # the result was evicted or expired before its memo key
+            return _NOT_STORED
+
+    @staticmethod
+    def memoize(namespace: str, ttl=None, version=None, ignore=()):
+        """Decorator that stores the results of a deterministic function in Redis,
+        keyed by a canonical hash of its arguments, e.g.
+
+            @redis_store.memoize(namespace="isograph_data", ttl=3600, version=2)
+            def reformat_isograph_data(compstr): ...
+
+        Results are saved like save, so they are shared by all processes, and
+        expire after ttl seconds together with their key. Later calls return a
+        copy of the result, so callers may modify it; values that are not
+        restored with their types (see the class docstring) are returned as
+        loaded, e.g. Plotly figures as dicts. Change version when the function
+        or its data changes. Arguments named in ignore are not part of the key, e.g.
+        inputs that are determined by the other arguments.
+
+        Concurrent calls with the same arguments are computed once: the first
+        call holds a lock in Redis, the others wait for its result for up to
+        memo_lock_timeout seconds. Exceptions are raised to the caller and not
+        stored. Calls whose arguments cannot be hashed are evaluated directly,
+        results that cannot be saved are returned without being stored.
+        """
+
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if redis_store.memo_bypass:
+                    return func(*args, **kwargs)
+                # positional and keyword calls share the same key
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                digest = hashlib.blake2b()
+                try:
+                    _update_digest(
+                        digest,
+                        {k: v for k, v in bound.arguments.items() if k not in ignore},
+                    )
+                except TypeError as e:
+                    logger.warning(f"Not memoizing {func.__qualname__}: {e}")
+                    digest = None
+                if digest is None:
+                    return func(*args, **kwargs)
+                memo_key = redis_store._memo_key(namespace, version, digest.hexdigest())
+                stats = redis_store.memo_stats
+
+                result = redis_store._memo_lookup(memo_key)
+                if result is not _NOT_STORED:
+                    stats.count(stats.hits, namespace)
+                    return result
+                # single flight: only the holder of the lock computes the result
+                lock_key = f"{memo_key}_lock"
+                token = uuid.uuid4().hex
+                deadline = time.monotonic() + redis_store.memo_lock_timeout
+                waited = False
+                while not redis_store.r.set(
+                    lock_key, token, nx=True, ex=redis_store.memo_lock_timeout
+                ):
+                    if time.monotonic() > deadline:
+                        logger.warning(f"Timed out waiting for {memo_key}")
+                        token = None
+                        break
+                    if not waited:
+                        waited = True
+                        stats.count(stats.waits, namespace)
+                    time.sleep(redis_store.memo_poll_interval)
+                    result = redis_store._memo_lookup(memo_key)
+                    if result is not _NOT_STORED:
+                        stats.count(stats.hits, namespace)
+                        return result
+                try:
+                    # the previous holder may have stored it just before
+                    result = redis_store._memo_lookup(memo_key)
+                    if result is not _NOT_STORED:
+                        stats.count(stats.hits, namespace)
+                        return result
+                    stats.count(stats.misses, namespace)
+                    result = func(*args, **kwargs)
+                    try:
+                        redis_store.r.set(
+                            memo_key, redis_store.save(result, ttl=ttl), ex=ttl
+                        )
+                    except _STORE_ERRORS as e:
+                        # the result is still returned, only not shared
+                        logger.error(
+                            f"{e}\nERROR STORING {func.__qualname__} ({memo_key})"
+                        )
+                    return result
+                finally:
+                    # the lock may have expired and been taken by another call
+                    if token is not None and redis_store.r.get(lock_key) == (
+                        token.encode("utf-8")
+                    ):
+                        redis_store.r.delete(lock_key)
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def benchmark(df: pd.DataFrame, codecs=None, number=3) -> pd.DataFrame:
+        """Encode/decode time in ms (best of number runs) and size per codec for df.
+
+        Codecs whose dependencies are missing are skipped.
+        """
+        results = {}
+        for codec in codecs or CODECS:
+            encode, decode = CODECS[codec]
+            try:
+                encode_times, decode_times = [], []
+                for _ in range(number):
+                    start = time.perf_counter()
+                    serialized_value = encode(df)
+                    encode_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    decode(serialized_value)
+                    decode_times.append(time.perf_counter() - start)
+            except ImportError as e:
+                logger.warning(f"Skipping codec {codec}: {e}")
+                continue
+            results[codec] = {
+                "encode_ms": 1e3 * min(encode_times),
+                "decode_ms": 1e3 * min(decode_times),
+                "bytes": len(serialized_value),
+            }
+        return pd.DataFrame.from_dict(results, orient="index").sort_values("decode_ms")
+
+
+# registered once for all clients, they must not be used in forked child processes
+os.register_at_fork(after_in_child=redis_store._reset_clients)
@@ -17,6 +17,8 @@ from dash.exceptions import PreventUpdate
 from mpships.redox_thermo_csp.redox_views import InitData as ID
 from mpships.redox_thermo_csp.redox_views import Isographs as Iso
 from mpships.redox_thermo_csp.redox_views import energy_analysis
+from mpships.redox_thermo_csp.redox_utils import thermo_cache
+from mpships.redis_store import redis_store
 from mp_web.core.utils import (
     get_rester,
     get_tooltip,
@@ -1168,19 +1170,22 @@ class RedoxThermoCSPAIO(html.Div):
     @callback(
         Output(ids.isotherm(MATCH), "figure"),
         Input(ids.isographs_data_table(MATCH), "selectedRows"),
-        Input(ids.temp_slider(MATCH), "value"),
-        Input(ids.pressure_range(MATCH), "value"),
+        Input(ids.temp_slider(MATCH), "drag_value"),
+        Input(ids.pressure_range(MATCH), "drag_value"),
+        State(ids.temp_slider(MATCH), "value"),
+        State(ids.pressure_range(MATCH), "value"),
         prevent_initial_call=True,
     )
-    def update_fig_0(row, temp_slider, pressure_range):
+    def update_fig_0(row, temp_drag, pressure_range_drag, temp_slider, pressure_range):
+        # the isotherms are evaluated without root finding, so they can follow the sliders while dragging
         compstr = row[0]["Theoretical Composition"]
         theo_data = reformat_isograph_data(compstr)
         return get_figure(
             figure_number=0,
             theo_data=theo_data,
             compstr=compstr,
-            constant=temp_slider,
-            rng=pressure_range,
+            constant=temp_drag if temp_drag is not None else temp_slider,
+            rng=pressure_range_drag if pressure_range_drag else pressure_range,
         )
 
     @callback(
@@ -1204,19 +1209,24 @@ class RedoxThermoCSPAIO(html.Div):
     @callback(
         Output(ids.isoredox(MATCH), "figure"),
         Input(ids.isographs_data_table(MATCH), "selectedRows"),
-        Input(ids.redox_slider(MATCH), "value"),
-        Input(ids.redox_temp_range(MATCH), "value"),
+        Input(ids.redox_slider(MATCH), "drag_value"),
+        Input(ids.redox_temp_range(MATCH), "drag_value"),
+        State(ids.redox_slider(MATCH), "value"),
+        State(ids.redox_temp_range(MATCH), "value"),
         prevent_initial_call=True,
     )
-    def update_fig_2(row, redox_slider, redox_temp_range):
+    def update_fig_2(
+        row, redox_drag, redox_temp_range_drag, redox_slider, redox_temp_range
+    ):
+        # the isoredox curves are evaluated without root finding, so they can follow the sliders while dragging
         compstr = row[0]["Theoretical Composition"]
         theo_data = reformat_isograph_data(compstr)
         return get_figure(
             figure_number=2,
             theo_data=theo_data,
             compstr=compstr,
-            constant=redox_slider,
-            rng=redox_temp_range,
+            constant=redox_drag if redox_drag is not None else redox_slider,
+            rng=redox_temp_range_drag if redox_temp_range_drag else redox_temp_range,
         )
 
     @callback(
@@ -1640,6 +1650,7 @@ def enera_fig_gen(
     return fig
 
 
+@redis_store.memoize(namespace="redox_energy_analysis", ttl=24 * 3600, version=1)
 def query_mp_contribs_energy_analysis(
     process_type="AS",
     t_ox=500,
@@ -1758,21 +1769,26 @@ def get_figure(figure_number, theo_data, compstr, constant=None, rng=None, delta
     def get_isograph_data(
         theo_data, _EXP_DATA, compstr, plottype, constant, rng, delta
     ):
-        try:
-            pars = ID.init_isographs(theo_data, _EXP_DATA, compstr=compstr)[1]
-            Iso_I = Iso(compstr, plottype, constant, rng)
-            payload, x_val = Iso_I.prepare_limits()
-            if plottype == "dH" or plottype == "dS":
-                result = Iso_I.enthalpy_entropy(pars=pars, payload=payload, x_val=x_val)
-            elif plottype == "ellingham":
-                result = Iso_I.ellingham(
-                    pars=pars, payload=payload, x_val=x_val, delta=delta
-                )
-            else:
-                result = Iso_I.isographs(pars=pars, payload=payload, x_val=x_val)
-        except ValueError:
-            result = None
-            warnings.warn("No material selected")
+        # repeated evaluations of the thermodynamic kernels are shared within one figure
+        with thermo_cache() as cache:
+            try:
+                pars = ID.init_isographs(theo_data, _EXP_DATA, compstr=compstr)[1]
+                Iso_I = Iso(compstr, plottype, constant, rng)
+                payload, x_val = Iso_I.prepare_limits()
+                if plottype == "dH" or plottype == "dS":
+                    result = Iso_I.enthalpy_entropy(
+                        pars=pars, payload=payload, x_val=x_val
+                    )
+                elif plottype == "ellingham":
+                    result = Iso_I.ellingham(
+                        pars=pars, payload=payload, x_val=x_val, delta=delta
+                    )
+                else:
+                    result = Iso_I.isographs(pars=pars, payload=payload, x_val=x_val)
+            except ValueError:
+                result = None
+                warnings.warn("No material selected")
+        logger.debug(f"Thermo cache for {plottype} of {compstr}: {cache.stats()}")
         return result
 
     def figure_data(isodat_input):
@@ -1973,6 +1989,7 @@ def get_figure(figure_number, theo_data, compstr, constant=None, rng=None, delta
         return fig_5
 
 
+@redis_store.memoize(namespace="redox_isograph_data", ttl=24 * 3600, version=1)
 def reformat_isograph_data(compstr):
     """for use in isographs callbacks to get the isographs data into the correct format for
     use in other methods"""
@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import inspect
 import re
 import numpy as np
+import pandas as pd
+from collections import Counter
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache, wraps
 from itertools import groupby
 from pymatgen.core import Structure
 import pymatgen.core.periodic_table as ptable
@@ -12,6 +19,7 @@ from pymatgen.core.units import FloatWithUnit
 from scipy.constants import pi, R
 from scipy.optimize import brentq
 from scipy.integrate import quad
+from scipy.interpolate import CubicSpline
 from mp_web.core.utils import get_rester
 
 mpr = get_rester()
@@ -65,6 +73,108 @@ def rootfind(a, b, args, funciso_here):
     return solutioniso
 
 
+def solve_bracketed(func, lower, upper, args=(), xtol=2e-12, rtol=4e-16, maxiter=100):
+    """
+    Vectorized root finder for func(x, *args) = 0 with one bracket [lower, upper] per element
+    Uses Chandrupatla's method, a Brent-type combination of inverse quadratic interpolation and
+    bisection which keeps the root bracketed, so that all elements of the array are solved at once
+    Reference: T. R. Chandrupatla, Adv. Eng. Softw. 28 (1997) 145-149
+    :param func:    function taking an array x (and args) and returning an array of the same shape
+    :param lower:   lower limits of the brackets (scalar or array)
+    :param upper:   upper limits of the brackets (scalar or array)
+    :param args:    additional arguments for func, broadcast against x
+    :param xtol:    absolute tolerance, same as in scipy.optimize.brentq
+    :param rtol:    relative tolerance, same as in scipy.optimize.brentq
+    :param maxiter: maximum number of iterations
+    :return:        array of roots, NaN where [lower, upper] does not contain a sign change
+    """
+    b = np.asarray(lower, dtype=float)
+    a = np.asarray(upper, dtype=float)
+    f_b = np.asarray(func(b, *args), dtype=float)
+    f_a = np.asarray(func(a, *args), dtype=float)
+    shape = np.broadcast_shapes(a.shape, b.shape, f_a.shape, f_b.shape)
+    a, b, f_a, f_b = (np.broadcast_to(v, shape).copy() for v in (a, b, f_a, f_b))
+    c, f_c = a.copy(), f_a.copy()
+
+    root = np.full(shape, np.nan)
+    root[f_b == 0] = b[f_b == 0]
+    root[f_a == 0] = a[f_a == 0]
+    active = (np.sign(f_a) * np.sign(f_b)) < 0
+    t = np.full(shape, 0.5)
+
+    for _ in range(maxiter):
+        if not active.any():
+            break
+        x_t = a + t * (b - a)
+        f_t = np.broadcast_to(func(x_t, *args), shape).astype(float)
+
+        # keep the root bracketed between a and b, c is the previous value of b
+        same = np.sign(f_t) == np.sign(f_a)
+        c = np.where(same, a, b)
+        f_c = np.where(same, f_a, f_b)
+        b = np.where(same, b, a)
+        f_b = np.where(same, f_b, f_a)
+        a, f_a = x_t, f_t
+
+        a_best = np.abs(f_a) < np.abs(f_b)
+        x_m = np.where(a_best, a, b)
+        f_m = np.where(a_best, f_a, f_b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_lim = (2 * rtol * np.abs(x_m) + xtol) / np.abs(b - c)
+        converged = active & ((f_m == 0) | ~(t_lim <= 0.5))
+        root[converged] = x_m[converged]
+        active &= ~converged
+
+        # inverse quadratic interpolation where it is expected to be reliable
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xi = (a - b) / (c - b)
+            phi = (f_a - f_b) / (f_c - f_b)
+            t_iqi = (f_a / (f_b - f_a)) * (f_c / (f_b - f_c)) + ((c - a) / (b - a)) * (
+                f_a / (f_c - f_a)
+            ) * (f_b / (f_c - f_b))
+        use_iqi = (phi**2 < xi) & ((1 - phi) ** 2 < 1 - xi)
+        t = np.where(use_iqi, t_iqi, 0.5)
+        t = np.clip(t, t_lim, 1 - t_lim)
+        t = np.where(active & np.isfinite(t), t, 0.5)
+
+    root[active] = np.where(np.abs(f_a) < np.abs(f_b), a, b)[active]
+    return root
+
+
+def resolve_bracketed(func, solution, lower, upper, args=()):
+    """
+    Solves func(x, *args) = 0 again on the bracket [lower, upper], but only for the elements
+    of solution for which no root has been found yet (NaN)
+    :param solution:    array of roots as returned by solve_bracketed
+    :return:            array of roots, NaN if no solution can be found in either bracket
+    """
+    missing = np.isnan(solution)
+    if not missing.any():
+        return solution
+    args_missing = tuple(
+        (
+            np.broadcast_to(arg, missing.shape)[missing]
+            if isinstance(arg, np.ndarray) and arg.ndim
+            else arg
+        )
+        for arg in args
+    )
+    solution = solution.copy()
+    solution[missing] = solve_bracketed(func, lower, upper, args=args_missing)
+    return solution
+
+
+def rootfind_vec(a, b, args, funciso_here):
+    """
+    Array version of rootfind, solving funciso_here for all elements of args at once
+    Elements are first solved on the bracket [0.01, 0.49], and those without a sign change
+    within this range are solved again on [a, b]
+    :return:    array of solutions, NaN if no solution can be found
+    """
+    solutioniso = solve_bracketed(funciso_here, 0.01, 0.49, args=args)
+    return resolve_bracketed(funciso_here, solutioniso, a, b, args=args)
+
+
 def get_energy_data(
     en_dat,
     process_type="Air Separation",
@@ -93,48 +203,212 @@ def get_energy_data(
     return [x for x in en_dat if x["_id"] == db_id]
 
 
-def s_th_o(temp):
+class ThermoCache:
+    """
+    Memo of the thermodynamic kernels decorated with thermo_memo (p_o2_calc, s_th_o, vib_ent, ...)
+    Results are keyed by the kernel and its full argument tuple. The cache is only used within
+    a thermo_cache() context, which is opened for each figure build
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.hits = Counter()
+        self.misses = Counter()
+
+    @property
+    def hit_rate(self):
+        calls = sum(self.hits.values()) + sum(self.misses.values())
+        return sum(self.hits.values()) / calls if calls else 0.0
+
+    def stats(self):
+        """:return:    hits and misses per kernel and the overall hit rate"""
+        stats = {
+            name: {"hits": self.hits[name], "misses": self.misses[name]}
+            for name in sorted(set(self.hits) | set(self.misses))
+        }
+        stats["hit_rate"] = self.hit_rate
+        return stats
+
+
+# cache of the current evaluation context, see thermo_cache
+_thermo_cache = ContextVar("thermo_cache", default=None)
+
+
+@contextmanager
+def thermo_cache():
+    """
+    Evaluation context in which repeated calls of the thermodynamic kernels with the same
+    arguments are looked up instead of recalculated. The cache is discarded on exit
+        with thermo_cache() as cache:
+            ...
+        cache.stats()
+    :return:    ThermoCache of this context
+    """
+    cache = ThermoCache()
+    token = _thermo_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _thermo_cache.reset(token)
+
+
+def freeze_args(value):
+    """
+    converts (nested) arguments to a hashable key, arrays are keyed by dtype, shape and content
+    Lists of numbers share the key of the equal array
+    """
+    if isinstance(value, list):
+        try:
+            array = np.asarray(value)
+        except ValueError:  # ragged, e.g. the act matrix [[], act]
+            array = None
+        if array is not None and array.dtype.kind in "biufc":
+            value = array
+    if isinstance(value, np.ndarray):
+        return value.dtype.str, value.shape, value.tobytes()
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_args(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, freeze_args(v)) for k, v in sorted(value.items()))
+    return value
+
+
+def thermo_memo(func):
+    """
+    Decorator for the thermodynamic kernels, memoizes results within a thermo_cache() context
+    Outside of such a context, the kernel is always evaluated
+    """
+
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _thermo_cache.get()
+        if cache is None:
+            return func(*args, **kwargs)
+        # positional and keyword calls share the same key
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__, freeze_args(tuple(bound.arguments.values())))
+        try:
+            result = cache.values[key]
+        except KeyError:
+            cache.misses[func.__name__] += 1
+            result = func(*args, **kwargs)
+            if isinstance(result, np.ndarray):
+                # shared between callers
+                result.flags.writeable = False
+            cache.values[key] = result
+        else:
+            cache.hits[func.__name__] += 1
+        return result
+
+    return wrapper
+
+
+def shomate_select(temp, bounds, shomdat, inclusive=False):
+    """
+    Selects the Shomate parameters for piecewise temperature ranges, temp can be an array of any shape
+    :param temp:        temperature in K
+    :param bounds:      upper temperature limits of all but the last range, in ascending order
+    :param shomdat:     Shomate parameters of each range (one more than bounds)
+    :param inclusive:   if True, temperatures equal to a limit belong to the lower range
+    :return:            array of shape temp.shape + (number of parameters,)
+    """
+    temp = np.asarray(temp, dtype=float)[..., None]
+    if not bounds:  # a single range, np.select needs at least one condition
+        shomdat = np.asarray(shomdat[0], dtype=float)
+        return np.broadcast_to(shomdat, temp.shape[:-1] + shomdat.shape)
+    below = np.less_equal if inclusive else np.less
+    return np.select(
+        [below(temp, bound) for bound in bounds], shomdat[:-1], shomdat[-1]
+    )
+
+
+def shomate_c_p(temp, shomdat):
+    """
+    Shomate equation for the heat capacity, cp = A + B*t + C*t2 + D*t3 + E/t2 with t = T/1000
+    :param shomdat:     parameters A-E as returned by shomate_select
+    :return:            heat capacity in J/molK
+    """
+    temp_frac = np.asarray(temp, dtype=float) / 1000.0
+    return (
+        shomdat[..., 0]
+        + (shomdat[..., 1] * temp_frac)
+        + (shomdat[..., 2] * (temp_frac**2))
+        + (shomdat[..., 3] * (temp_frac**3))
+        + (shomdat[..., 4] / (temp_frac**2))
+    )
+
+
+def shomate_h(temp, shomdat):
+    """
+    Shomate equation for the enthalpy, H° = A*t + B*t2/2 + C*t3/3 + D*t4/4 − E/t + F with t = T/1000
+    :param shomdat:     parameters A-F as returned by shomate_select
+    :return:            enthalpy in kJ/mol
+    """
+    t_1000 = np.asarray(temp, dtype=float) / 1000
+    return (
+        shomdat[..., 0] * t_1000
+        + 0.5 * shomdat[..., 1] * (t_1000**2)
+        + (1 / 3) * shomdat[..., 2] * (t_1000**3)
+        + (1 / 4) * shomdat[..., 3] * (t_1000**4)
+        - shomdat[..., 4] / t_1000
+        + shomdat[..., 5]
+    )
+
+
+@thermo_memo
+def s_th_o_vec(temp):
+    """
+    Array version of s_th_o, temp can be an array of any shape
+    :param temp:    temperature in K
+    :return:        0.5 * standard entropy of O2 in J/molK
+    """
     # constants: Chase, NIST-JANAF Thermochemistry tables, Fourth Edition, 1998
-    if temp < 700:
-        shomdat = [
-            31.32234,
-            -20.23531,
-            57.86644,
-            -36.50624,
-            -0.007374,
-            -8.903471,
-            246.7945,
-        ]
-    elif temp < 2000:
-        shomdat = [
-            30.03235,
-            8.772972,
-            -3.988133,
-            0.788313,
-            -0.741599,
-            -11.32468,
-            236.1663,
-        ]
-    else:
-        shomdat = [
-            20.91111,
-            10.72071,
-            -2.020498,
-            0.146449,
-            9.245722,
-            5.337651,
-            237.6185,
-        ]
-    temp_frac = temp / 1000.0
-    szero = shomdat[0] * np.log(temp_frac)
-    szero += shomdat[1] * temp_frac
-    szero += 0.5 * shomdat[2] * temp_frac**2
-    szero += shomdat[3] / 3.0 * temp_frac**3
-    szero -= shomdat[4] / (2 * temp_frac**2)
-    szero += shomdat[6]
+    shomdat = shomate_select(
+        temp,
+        [700, 2000],
+        [
+            [31.32234, -20.23531, 57.86644, -36.50624, -0.007374, -8.903471, 246.7945],
+            [30.03235, 8.772972, -3.988133, 0.788313, -0.741599, -11.32468, 236.1663],
+            [20.91111, 10.72071, -2.020498, 0.146449, 9.245722, 5.337651, 237.6185],
+        ],
+    )
+    temp_frac = np.asarray(temp, dtype=float) / 1000.0
+    szero = shomdat[..., 0] * np.log(temp_frac)
+    szero += shomdat[..., 1] * temp_frac
+    szero += 0.5 * shomdat[..., 2] * temp_frac**2
+    szero += shomdat[..., 3] / 3.0 * temp_frac**3
+    szero -= shomdat[..., 4] / (2 * temp_frac**2)
+    szero += shomdat[..., 6]
     return 0.5 * szero
 
 
+def s_th_o(temp):
+    return float(s_th_o_vec(temp))
+
+
+def c_p_o2(temp):
+    """
+    Heat capacity of O2 based on the same Shomate parameters as s_th_o, temp can be an array
+    d(s_th_o)/dT = 0.5 * c_p_o2(temp) / temp
+    :param temp:    temperature in K
+    :return:        heat capacity in J/molK
+    """
+    # constants: Chase, NIST-JANAF Thermochemistry tables, Fourth Edition, 1998
+    shomdat = shomate_select(
+        temp,
+        [700, 2000],
+        [
+            [31.32234, -20.23531, 57.86644, -36.50624, -0.007374],
+            [30.03235, 8.772972, -3.988133, 0.788313, -0.741599],
+            [20.91111, 10.72071, -2.020498, 0.146449, 9.245722],
+        ],
+    )
+    return shomate_c_p(temp, shomdat)
+
+
 def dh_ds(delta, s_th, p):
     d_delta = delta - p["delta_0"]
     dh_pars = [p["fit_param_enth"][c] for c in "abcd"]
@@ -227,7 +501,7 @@ def entr_dilute_spec(x, s_v, a, delta_0, s_th_o):
 
 
 def funciso_theo(delta, iso, x, p, t_d_perov, t_d_brownm, dh_min, dh_max, act):
-    dh = d_h_num_dev_calc(delta=delta, dh_1=dh_min, dh_2=dh_max, temp=x, act=act)
+    dh = d_h_analytic_calc(delta=delta, dh_1=dh_min, dh_2=dh_max, temp=x, act=act)
     ds = d_s_fundamental(
         delta=delta,
         dh_1=dh_min,
@@ -241,7 +515,7 @@ def funciso_theo(delta, iso, x, p, t_d_perov, t_d_brownm, dh_min, dh_max, act):
 
 
 def funciso_redox_theo(po2, delta, x, p, t_d_perov, t_d_brownm, dh_min, dh_max, act):
-    dh = d_h_num_dev_calc(delta=delta, dh_1=dh_min, dh_2=dh_max, temp=x, act=act)
+    dh = d_h_analytic_calc(delta=delta, dh_1=dh_min, dh_2=dh_max, temp=x, act=act)
     ds = d_s_fundamental(
         delta=delta,
         dh_1=dh_min,
@@ -298,6 +572,7 @@ def d_h_num_dev_1(delta, dh_1, dh_2, temp, act):
     return np.log(result_1)
 
 
+@thermo_memo
 def p_o2_calc(delta, dh_1, dh_2, temp, act):
     """
     Calculates the oxygen partial pressure p_O2 of a perovskite solid solution with two redox-active species
@@ -338,8 +613,8 @@ def delta_mix(temp, p_o2_l, dh_1, dh_2, act):
 
 def delta_fun(stho, temp, p_o2_l, dh, d_max):
     common = np.exp(stho * d_max / R)
-    common *= np.exp(p_o2_l) ** (-d_max / 2.0)
-    common *= np.exp(-dh * d_max / (R * temp))
+    common = common * np.exp(p_o2_l) ** (-d_max / 2.0)
+    common = common * np.exp(-dh * d_max / (R * temp))
     return d_max * common / (1.0 + common)
 
 
@@ -426,6 +701,342 @@ def entr_con_mixed(temp, p_o2_l, dh_1, dh_2, act):
     return entr_con_1 + entr_con_2
 
 
+def funciso_theo_vec(delta, iso, x, p, t_d_perov, t_d_brownm, dh_min, dh_max, act):
+    """
+    Array version of funciso_theo, delta, iso and x can be arrays of (broadcastable) shape
+    """
+    p_o2_l = np.log(p_o2_calc_vec(delta, dh_min, dh_max, x, act))
+    dh = d_h_implicit(temp=x, p_o2_l=p_o2_l, dh_1=dh_min, dh_2=dh_max, act=act)
+    ds = d_s_fundamental_vec(
+        delta=delta,
+        dh_1=dh_min,
+        dh_2=dh_max,
+        temp=x,
+        act=act,
+        t_d_perov=t_d_perov,
+        t_d_brownm=t_d_brownm,
+        p_o2_l=p_o2_l,
+    )
+    return dh - x * ds + R * iso * x / 2
+
+
+def funciso_redox_theo_vec(
+    po2, delta, x, p, t_d_perov, t_d_brownm, dh_min, dh_max, act
+):
+    """
+    Array version of funciso_redox_theo, po2, delta and x can be arrays of (broadcastable) shape
+    """
+    dh, ds = d_h_d_s_theo_vec(delta, x, t_d_perov, t_d_brownm, dh_min, dh_max, act)
+    return dh - x * ds + R * po2 * x / 2
+
+
+def d_h_d_s_theo_vec(delta, x, t_d_perov, t_d_brownm, dh_min, dh_max, act):
+    """
+    Theoretical dH and dS at constant delta, delta and x can be arrays of (broadcastable) shape
+    :param delta:   non-stoichiometry delta
+    :param x:       temperature in K
+    :return:        enthalpy change dH, entropy change dS
+    """
+    p_o2_l = np.log(p_o2_calc_vec(delta, dh_min, dh_max, x, act))
+    dh = d_h_implicit(temp=x, p_o2_l=p_o2_l, dh_1=dh_min, dh_2=dh_max, act=act)
+    ds = d_s_fundamental_vec(
+        delta=delta,
+        dh_1=dh_min,
+        dh_2=dh_max,
+        temp=x,
+        act=act,
+        t_d_perov=t_d_perov,
+        t_d_brownm=t_d_brownm,
+        p_o2_l=p_o2_l,
+    )
+    return dh, ds
+
+
+def isoredox_theo_closed_form(
+    delta, x, t_d_perov, t_d_brownm, dh_min, dh_max, act, lim=300
+):
+    """
+    Solves funciso_redox_theo(po2, delta, x, ...) = 0 for p_O2 without a root finder
+    dH and dS do not depend on po2 at constant delta, so the isoredox line is explicit:
+    ln(p_O2) = -2 * (dH - T * dS) / (R * T)
+    :param delta:   non-stoichiometry delta (scalar or array)
+    :param x:       temperature in K (scalar or array)
+    :param lim:     largest |ln(p_O2)|, same as the bracket used by solve_bracketed
+    :return:        array of p_O2 in bar, NaN if no solution can be found
+    """
+    dh, ds = d_h_d_s_theo_vec(delta, x, t_d_perov, t_d_brownm, dh_min, dh_max, act)
+    p_o2_l = -2 * (dh - x * ds) / (R * x)
+    return np.exp(np.where(np.abs(p_o2_l) <= lim, p_o2_l, np.nan))
+
+
+def d_h_analytic_calc(delta, dh_1, dh_2, temp, act):
+    """
+    Calculates dH = -0.5 * d(ln(p_O2))/d(1/RT) at constant delta analytically, see d_h_implicit
+    Replaces the numerical derivative in d_h_num_dev_calc, delta and temp can be arrays
+    :param delta:   non-stoichiometry delta
+    :param dh_1:    reaction enthalpy of perovskite 1
+    :param dh_2:    reaction enthalpy of perovskite 2
+    :param temp:    temperature in K
+    :return:        enthalpy change dH
+    """
+    if np.ndim(delta) == 0 and np.ndim(temp) == 0:
+        # same solve as in d_s_fundamental, shared within a thermo_cache() context
+        p_o2_l = np.log(p_o2_calc(delta, dh_1, dh_2, temp, act))
+    else:
+        p_o2_l = np.log(p_o2_calc_vec(delta, dh_1, dh_2, temp, act))
+    return d_h_implicit(temp, p_o2_l, dh_1, dh_2, act)
+
+
+def d_h_implicit(temp, p_o2_l, dh_1, dh_2, act, stho=None):
+    """
+    dH = -0.5 * d(ln(p_O2))/d(1/RT) at constant delta = delta_mix(temp, p_o2_l), obtained by
+    implicit differentiation of delta_mix. With delta_i = delta_fun(..., d_max_i) and
+    w_i = d_max_i * delta_i * (1 - delta_i / d_max_i), this is the weighted mean
+    dH = sum(w_i * (dh_i + T**2 * d(s_th_o)/dT)) / sum(w_i)
+    temp and p_o2_l can be arrays, no root finding is required
+    :param temp:    temperature in K
+    :param p_o2_l:  oxygen partial pressure as natural logarithm
+    :param dh_1:    reaction enthalpy of perovskite 1
+    :param dh_2:    reaction enthalpy of perovskite 2
+    :param stho:    s_th_o(temp), if already known
+    :return:        enthalpy change dH
+    """
+    if stho is None:
+        stho = s_th_o_vec(temp)
+    if type(act) == list:
+        act = float(act[-1])
+    d_stho = 0.5 * c_p_o2(temp) / temp
+    dh_sum, w_sum = 0.0, 0.0
+    for dh, d_max in ((dh_1, act / 2), (dh_2, (1 - act) / 2)):
+        delta = delta_fun(stho, temp, p_o2_l, dh, d_max)
+        w = delta * (d_max - delta)
+        dh_sum = dh_sum + w * (dh + temp**2 * d_stho)
+        w_sum = w_sum + w
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return dh_sum / w_sum
+
+
+@thermo_memo
+def p_o2_calc_vec(delta, dh_1, dh_2, temp, act):
+    """
+    Array version of p_o2_calc, solving for all values of delta and temp at once
+    :param delta:   non-stoichiometry delta (scalar or array)
+    :param temp:    temperature in K (scalar or array)
+    :return:        p_O2 as absolute value, NaN if no solution can be found
+    """
+    delta, temp = np.broadcast_arrays(
+        np.asarray(delta, dtype=float), np.asarray(temp, dtype=float)
+    )
+
+    stho = s_th_o_vec(temp)
+
+    def fun_p_o2(p_o2_l, delta, temp, stho):
+        return delta_mix_vec(temp, p_o2_l, dh_1, dh_2, act, stho=stho) - delta
+
+    args = (delta, temp, stho)
+    sol_p_o2_l = solve_bracketed(fun_p_o2, -100, 100, args=args)
+    sol_p_o2_l = resolve_bracketed(fun_p_o2, sol_p_o2_l, -300, 300, args=args)
+
+    return np.exp(sol_p_o2_l)
+
+
+def delta_mix_vec(temp, p_o2_l, dh_1, dh_2, act, stho=None):
+    """
+    Array version of delta_mix, temp and p_o2_l can be arrays
+    :param stho:    s_th_o(temp), if already known
+    :return:        total non-stoichiometry delta
+    """
+    if stho is None:
+        stho = s_th_o_vec(temp)
+    if type(act) == list:
+        act = float(act[-1])
+    return delta_fun(stho, temp, p_o2_l, dh_1, (act / 2)) + delta_fun(
+        stho, temp, p_o2_l, dh_2, ((1 - act) / 2)
+    )
+
+
+def d_s_fundamental_vec(
+    delta, dh_1, dh_2, temp, act, t_d_perov, t_d_brownm, p_o2_l=None
+):
+    """
+    Array version of d_s_fundamental, delta and temp can be arrays
+    :param p_o2_l:  ln(p_O2) at delta and temp, if already known
+    """
+    p_mol_ent_o = s_th_o_vec(temp)
+    if p_o2_l is None:
+        p_o2_l = np.log(
+            p_o2_calc_vec(delta=delta, dh_1=dh_1, dh_2=dh_2, temp=temp, act=act)
+        )
+    entr_con = entr_con_mixed_vec(
+        temp=temp, p_o2_l=p_o2_l, dh_1=dh_1, dh_2=dh_2, act=act
+    )
+    entr_vib = vib_ent(temp, t_d_perov, t_d_brownm)
+    return p_mol_ent_o + entr_con + entr_vib
+
+
+def entr_con_mixed_vec(temp, p_o2_l, dh_1, dh_2, act, stho=None):
+    """
+    Array version of entr_con_mixed, temp and p_o2_l can be arrays
+    :param stho:        s_th_o(temp), if already known
+    :return:            configurational entropy
+    """
+    a = 2
+    if stho is None:
+        stho = s_th_o_vec(temp)
+
+    # fix reversed orders
+    if dh_1 > dh_2:
+        dh_1, dh_2 = dh_2, dh_1
+
+    if type(act) == list:
+        act = float(act[-1])
+    # avoiding errors due to division by zero
+    delta_max_1 = 1e-10 if act == 0 else act * 0.5
+    delta_max_2 = 0.5 - 1e-10 if act == 1 else 0.5 - (act * 0.5)
+
+    delta_1 = delta_fun(stho, temp, p_o2_l, dh_1, (act / 2))
+    delta_2 = delta_fun(stho, temp, p_o2_l, dh_2, ((1 - act) / 2))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entr_con_1 = (
+            (1 / delta_max_1)
+            * (a / 2)
+            * R
+            * (np.log(delta_max_1 - delta_1) - np.log(delta_1))
+            * (delta_1 / (delta_1 + delta_2))
+        )
+        entr_con_2 = (
+            (1 / delta_max_2)
+            * (a / 2)
+            * R
+            * (np.log(delta_max_2 - delta_2) - np.log(delta_2))
+            * (delta_2 / (delta_1 + delta_2))
+        )
+
+    return np.where(delta_1 > 0.0, entr_con_1, 0.0) + np.where(
+        delta_2 > 0.0, entr_con_2, 0.0
+    )
+
+
+def delta_theo_closed_form(
+    iso, x, t_d_perov, t_d_brownm, dh_min, dh_max, act, a=1e-10, b=0.5 - 1e-10
+):
+    """
+    Solves funciso_theo(delta, iso, x, ...) = 0 for delta without an outer root finder
+    delta_mix gives delta, dH and dS as explicit functions of T and ln(p_O2). The model is therefore
+    evaluated on a grid of ln(p_O2) values, and the isotherm/isobar is found from the sign change
+    of funciso_theo along this grid, which is first located on a coarse grid and then refined
+    :param iso:     oxygen partial pressure as natural logarithm (scalar or array)
+    :param x:       temperature in K (scalar or array)
+    :param a:       lower limit for delta
+    :param b:       upper limit for delta
+    :return:        array of delta, NaN if no solution can be found
+    """
+    iso, temp = np.broadcast_arrays(
+        np.asarray(iso, dtype=float), np.asarray(x, dtype=float)
+    )
+    # temperature-dependent terms only need to be calculated once per temperature
+    temps, row = np.unique(temp, return_inverse=True)
+    row = row.reshape(temp.shape)
+    stho = s_th_o_vec(temps)
+    entr_vib = vib_ent(temps, t_d_perov, t_d_brownm)
+
+    def funciso_grid(p_o2_l, temp, stho, entr_vib, iso):
+        delta = delta_mix_vec(temp, p_o2_l, dh_min, dh_max, act, stho=stho)
+        dh = d_h_implicit(temp, p_o2_l, dh_min, dh_max, act, stho=stho)
+        ds = (
+            stho
+            + entr_con_mixed_vec(temp, p_o2_l, dh_min, dh_max, act, stho=stho)
+            + entr_vib
+        )
+        return delta, dh - temp * ds + R * iso * temp / 2
+
+    # coarse grid, same range as the brackets used in p_o2_calc
+    p_o2_l_coarse = np.linspace(-300, 300, 241)
+    delta_coarse, g_coarse = funciso_grid(
+        p_o2_l_coarse, temps[:, None], stho[:, None], entr_vib[:, None], 0.0
+    )
+    found, k, lower, upper = rootfind_grid(
+        g_coarse[row] + R * iso[..., None] * temp[..., None] / 2,
+        delta_coarse[row],
+        a,
+        b,
+    )
+
+    # refine between the grid points enclosing the sign change
+    steps = np.linspace(0, 1, 33)
+    p_o2_l_fine = (
+        p_o2_l_coarse[k][..., None] + (p_o2_l_coarse[1] - p_o2_l_coarse[0]) * steps
+    )
+    delta_fine, f_fine = funciso_grid(
+        p_o2_l_fine,
+        temp[..., None],
+        stho[row][..., None],
+        entr_vib[row][..., None],
+        iso[..., None],
+    )
+    found_fine, j = sign_change_grid(
+        f_fine, delta_fine, lower[..., None], upper[..., None]
+    )
+    delta = interp_grid(f_fine, delta_fine, j)
+
+    return np.where(found & found_fine, delta, np.nan)
+
+
+def sign_change_mask(fun_val, delta, lower, upper):
+    """
+    Marks the sign changes of fun_val along the last axis of a grid, only considering
+    grid points with lower <= delta <= upper
+    :param fun_val: function values, the last axis is the grid axis
+    :param delta:   values of delta on the grid, broadcastable to fun_val
+    :return:        True for the grid intervals [k, k+1] containing a sign change
+    """
+    valid = np.isfinite(fun_val) & (lower <= delta) & (delta <= upper)
+    change = np.sign(fun_val[..., :-1]) != np.sign(fun_val[..., 1:])
+    return change & valid[..., :-1] & valid[..., 1:]
+
+
+def sign_change_grid(fun_val, delta, lower, upper):
+    """
+    Finds the first sign change of fun_val along the last axis of a grid, see sign_change_mask
+    :return:        found:  True where a sign change exists
+                    k:      index of the grid interval [k, k+1] containing the sign change
+    """
+    change = sign_change_mask(fun_val, delta, lower, upper)
+    return change.any(axis=-1), np.argmax(change, axis=-1)
+
+
+def rootfind_grid(fun_val, delta, a, b):
+    """
+    Grid version of rootfind: sign changes within 0.01 < delta < 0.49 are preferred,
+    otherwise a < delta < b is used
+    :return:        found, k (see sign_change_grid) and the delta limits used for each element
+    """
+    found, k = sign_change_grid(fun_val, delta, 0.01, 0.49)
+    found_ab, k_ab = sign_change_grid(fun_val, delta, a, b)
+    lower = np.where(found, 0.01, a)
+    upper = np.where(found, 0.49, b)
+    return found | found_ab, np.where(found, k, k_ab), lower, upper
+
+
+def interp_grid(fun_val, values, k):
+    """
+    Linear interpolation of values at the root of fun_val in the grid interval [k, k+1]
+    :param fun_val: function values, the last axis is the grid axis
+    :param values:  values to interpolate, broadcastable to fun_val
+    :param k:       grid intervals as returned by sign_change_grid
+    :return:        interpolated values
+    """
+    fun_val, values = np.broadcast_arrays(fun_val, values)
+    k = np.asarray(k)[..., None]
+    f_0 = np.take_along_axis(fun_val, k, axis=-1)[..., 0]
+    f_1 = np.take_along_axis(fun_val, k + 1, axis=-1)[..., 0]
+    v_0 = np.take_along_axis(values, k, axis=-1)[..., 0]
+    v_1 = np.take_along_axis(values, k + 1, axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return v_0 + (v_1 - v_0) * np.where(f_0 == f_1, 0.0, f_0 / (f_0 - f_1))
+
+
 def get_mpids_comps_perov_brownm(compstr):
     compstr = compstr.split("O")[0] + "Ox"
     find_struct = find_structures(compstr=compstr)
@@ -560,33 +1171,83 @@ def get_debye_temp(mpid):
     return td
 
 
-def vib_ent(temp, t_d_perov, t_d_brownm):
+def debye_integral(y):
     """
-    Vibrational entropy based on the Debye model
-    :param temp:        temperature
-    :param delta:       non-stoichiometry delta
-    :return:            vibrational entropy
+    Debye function D_3(y) = 3 / y**3 * integral_0^y x**3 / (exp(x) - 1) dx, calculated with quad
+    :param y:           theta_D / T (scalar)
+    :return:            D_3(y)
     """
 
-    # integral for vibrational entropy using the Debye model
-    def s_int(temp, t_d):
-        def d_y(temp, t_d):
-            y = t_d / temp
+    def integrand(x):
+        return x**3 / (np.exp(x) - 1)
 
-            def integrand(x):
-                return x**3 / (np.exp(x) - 1)
+    if y == 0:
+        return 1.0
+    with np.errstate(over="ignore"):
+        return quad(integrand, 0, y)[0] * (3 / (y**3))
+
+
+@cache
+def debye_table(y_max=50.0, num=2001, rtol=1e-8):
+    """
+    Cubic spline of the Debye function D_3 on 0 <= y <= y_max, tabulated with quad on first use
+    The interpolation error is checked against quad in the middle of every interval of the table
+    For y > y_max, D_3(y) = pi**4 / (5 * y**3) up to terms of order exp(-y_max)
+    :param rtol:        guaranteed relative accuracy of the spline compared to quad
+    :return:            scipy.interpolate.CubicSpline
+    """
+    y = np.linspace(0, y_max, num)
+    # end slopes: D_3(y) = 1 - 3y/8 + ... for small y, pi**4 / (5 * y**3) for large y
+    spline = CubicSpline(
+        y,
+        [debye_integral(v) for v in y],
+        bc_type=((1, -3 / 8), (1, -3 * pi**4 / (5 * y_max**4))),
+    )
+    y_mid = (y[1:] + y[:-1]) / 2
+    d_mid = np.array([debye_integral(v) for v in y_mid])
+    error = np.max(np.abs(spline(y_mid) - d_mid) / d_mid)
+    if error > rtol:
+        raise RuntimeError(
+            f"Debye table exceeds the relative tolerance {rtol} ({error})"
+        )
+    return spline
+
+
+def debye_function(y):
+    """
+    Debye function D_3(y) from the interpolation table (see debye_table), y can be an array
+    :param y:           theta_D / T
+    :return:            D_3(y)
+    """
+    y = np.asarray(y, dtype=float)
+    spline = debye_table()
+    y_max = spline.x[-1]
+    with np.errstate(divide="ignore"):
+        d = np.where(y <= y_max, spline(np.minimum(y, y_max)), pi**4 / (5 * y**3))
+    return d[()]
 
-            if temp != 0:
-                integral_y = quad(integrand, 0, y)[0]
-                d = integral_y * (3 / (y**3))
-            else:
-                d = 0
-            return d
 
-        y = t_d / temp
-        s = R * (-3 * np.log(1 - np.exp(-y)) + 4 * d_y(temp, t_d))
+@thermo_memo
+def vib_ent(temp, t_d_perov, t_d_brownm, mode="table"):
+    """
+    Vibrational entropy based on the Debye model
+    :param temp:        temperature (scalar or array)
+    :param mode:        evaluation of the Debye function, either "table" (interpolation table,
+                        see debye_function) or "quad" (numerical integration as reference)
+    :return:            vibrational entropy
+    """
+    if mode not in ("table", "quad"):
+        raise ValueError("mode must be either 'table' or 'quad'")
 
-        return s
+    # integral for vibrational entropy using the Debye model
+    def s_int(temp, t_d):
+        with np.errstate(divide="ignore"):
+            y = t_d / np.asarray(temp, dtype=float)
+        if mode == "quad":
+            d_y = np.vectorize(debye_integral, otypes=[float])(y)
+        else:
+            d_y = debye_function(y)
+        return R * (-3 * np.log(1 - np.exp(-y)) + 4 * d_y)
 
     s_perov = s_int(temp, t_d_perov)
     s_brownm = s_int(temp, t_d_brownm)
@@ -947,6 +1608,40 @@ def unstable_phases(compstr):
     return unstable
 
 
+def mechanical_envelope_vec(p_red):
+    """
+    Array version of mechanical_envelope, p_red can be an array of any shape
+    :return: pump_ener_envelope:    mechanical energy required to pump one mol of O, inf outside of
+                                    1e-6 <= p_red <= 0.7
+    """
+    p_red = np.asarray(p_red, dtype=float)
+    eff_sol = 0.4
+
+    temp = 473  # this is the operating temperature of the pump
+    a0 = 0.30557
+    a1 = -0.17808
+    a2 = -0.15514
+    a3 = -0.03173
+    a4 = -0.00203
+    p0 = 1e5
+    p = p_red * p0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eff = (
+            a0
+            + a1 * np.log10(p / p0)
+            + a2 * (np.log10(p / p0)) ** 2
+            + a3 * (np.log10(p / p0)) ** 3
+            + a4 * (np.log10(p / p0)) ** 4
+        )
+        q_iso = R * temp * np.log(p0 / p)
+        q_pump = (q_iso / eff) / eff_sol
+    q_pump = q_pump / 2000
+
+    # mechanical envelope not applicable in this range
+    return np.where((p_red < 1e-6) | (p_red > 0.7), float("inf"), q_pump)
+
+
 def mechanical_envelope(p_red):
     """
     Uses the "mechanical envelope" function from Stefan Brendelberger et al.
@@ -957,33 +1652,27 @@ def mechanical_envelope(p_red):
 
     :return: pump_ener_envelope:    mechanical energy required to pump one mol of O
     """
+    return float(mechanical_envelope_vec(p_red))
 
-    if (p_red < 1e-6) or (p_red > 0.7):
-        q_pump = float("inf")  # mechanical envelope not applicable in this range
-    else:
-        eff_sol = 0.4
 
-        temp = 473  # this is the operating temperature of the pump
-        a0 = 0.30557
-        a1 = -0.17808
-        a2 = -0.15514
-        a3 = -0.03173
-        a4 = -0.00203
-        p0 = 1e5
-        p = p_red * p0
+# Shomate parameters A-E and upper limits of the temperature ranges
+# constants: Chase, NIST-JANAF Thermochemistry tables, Fourth Edition, 1998
+SHOMATE_WATER_LIQUID = ([], [[-203.6060, 1523.290, -3196.413, 2474.455, 3.855326]])
+SHOMATE_STEAM = (
+    [1700],
+    [
+        [30.09200, 6.832514, 6.793435, -2.534480, 0.082139],
+        [41.96126, 8.622053, -1.499780, 0.098119, -11.15764],
+    ],
+)
 
-        eff = (
-            a0
-            + a1 * np.log10(p / p0)
-            + a2 * (np.log10(p / p0)) ** 2
-            + a3 * (np.log10(p / p0)) ** 3
-            + a4 * (np.log10(p / p0)) ** 4
-        )
-        q_iso = R * temp * np.log(p0 / p)
-        q_pump = (q_iso / eff) / eff_sol
-        q_pump = q_pump / 2000
 
-    return q_pump
+def c_p_water_liquid_vec(temp):
+    """
+    Array version of c_p_water_liquid, temp can be an array of any shape
+    :return: cp_water
+    """
+    return shomate_c_p(temp, shomate_select(temp, *SHOMATE_WATER_LIQUID))
 
 
 def c_p_water_liquid(temp):
@@ -991,20 +1680,15 @@ def c_p_water_liquid(temp):
     Calculates the heat capacity of liquid water.
     :return: cp_water
     """
-    # constants: Chase, NIST-JANAF Thermochemistry tables, Fourth Edition, 1998
-    shomdat = [-203.6060, 1523.290, -3196.413, 2474.455, 3.855326]
+    return float(c_p_water_liquid_vec(temp))
 
-    temp_frac = temp / 1000
 
-    c_p_water = (
-        shomdat[0]
-        + (shomdat[1] * temp_frac)
-        + (shomdat[2] * (temp_frac**2))
-        + (shomdat[3] * (temp_frac**3))
-        + (shomdat[4] / (temp_frac**2))
-    )
-
-    return c_p_water
+def c_p_steam_vec(temp):
+    """
+    Array version of c_p_steam, temp can be an array of any shape
+    :return: cp_steam
+    """
+    return shomate_c_p(temp, shomate_select(temp, *SHOMATE_STEAM))
 
 
 def c_p_steam(temp):
@@ -1012,73 +1696,108 @@ def c_p_steam(temp):
     Calculates the heat capacity of steam
     :return: cp_steam
     """
-    if temp < 1700:
-        shomdat = [30.09200, 6.832514, 6.793435, -2.534480, 0.082139]
-    else:
-        shomdat = [41.96126, 8.622053, -1.499780, 0.098119, -11.15764]
-    temp_frac = temp / 1000
-
-    c_p_steam = (
-        shomdat[0]
-        + (shomdat[1] * temp_frac)
-        + (shomdat[2] * (temp_frac**2))
-        + (shomdat[3] * (temp_frac**3))
-        + (shomdat[4] / (temp_frac**2))
-    )
+    return float(c_p_steam_vec(temp))
 
-    return c_p_steam
 
+def shomate_c_p_integral(temp_1, temp_2, bounds, shomdat):
+    """
+    Exact integral of the Shomate heat capacity from temp_1 to temp_2 over piecewise temperature ranges
+    The antiderivative of each range is the Shomate enthalpy, which is evaluated on the part of
+    [temp_1, temp_2] within this range. temp_1 and temp_2 can be arrays
+    :param bounds:  upper temperature limits of all but the last range, see shomate_select
+    :param shomdat: Shomate parameters A-E of each range
+    :return:        integral of cp in J/mol
+    """
+    temp_1 = np.asarray(temp_1, dtype=float)
+    temp_2 = np.asarray(temp_2, dtype=float)
+    limits = [-np.inf] + list(bounds) + [np.inf]
+    energy = 0.0
+    for lower, upper, pars in zip(limits[:-1], limits[1:], shomdat):
+        pars = np.append(pars, 0.0)  # F cancels in the difference
+        energy = energy + 1000 * (
+            shomate_h(np.clip(temp_2, lower, upper), pars)
+            - shomate_h(np.clip(temp_1, lower, upper), pars)
+        )
+    return energy
 
-def energy_steam_generation(temp_1, temp_2, h_2_h2o, celsius=True, h_rec=0.0):
+
+def energy_steam_generation_vec(temp_1, temp_2, h_2_h2o, celsius=True, h_rec=0.0):
     """
-    Calculates the energy required to heat water, evaporate it and to generate steam at temperature "temp"
-    Assuming water at ambient pressure, boiling point 100 °C
-    :param temp_1:  initial temperature of water/steam
-    :param temp_2:  steam temperature
-    :param h_2_h2o: partial pressure ratio h2/h2o
-    :param celsius: if True, temperature values are assumed to be in degrees celsius
-    :param h_rec:   heat recovery efficiency, can be between 0 and 1
+    Array version of energy_steam_generation, temp_1, temp_2, h_2_h2o and h_rec can be arrays of
+    (broadcastable) shape. The heat capacities are integrated analytically (see shomate_c_p_integral)
     :return:        energy required to generate steam per mol of H2 in the product stream in kJ/mol
     """
-
+    temp_1 = np.asarray(temp_1, dtype=float)
+    temp_2 = np.asarray(temp_2, dtype=float)
     if celsius:
         temp_1 = temp_1 + 273.15
         temp_2 = temp_2 + 273.15
 
-    # liquid water (at ambient pressure)
+    # liquid water (at ambient pressure) up to the boiling point
     # this code only considers water at ambient pressure!
-    if temp_1 < 373.15:
-        if temp_2 > 373.15:
-            energy_1 = quad(c_p_water_liquid, temp_1, 373.15)[0]
-        else:
-            energy_1 = quad(c_p_water_liquid, temp_1, temp_2)[0]
-    else:
-        energy_1 = 0
-
-    if temp_2 > 373.15:
-        if temp_1 < 373.15:
-            energy_2 = quad(c_p_steam, 373.15, temp_2)[0]
-        else:
-            energy_2 = quad(c_p_steam, temp_1, temp_2)[0]
-    else:
-        energy_2 = 0
+    energy_1 = np.where(
+        temp_1 < 373.15,
+        shomate_c_p_integral(temp_1, np.minimum(temp_2, 373.15), *SHOMATE_WATER_LIQUID),
+        0.0,
+    )
+    # steam above the boiling point
+    energy_2 = np.where(
+        temp_2 > 373.15,
+        shomate_c_p_integral(np.maximum(temp_1, 373.15), temp_2, *SHOMATE_STEAM),
+        0.0,
+    )
 
     # from the literature
     heat_vaporization = 40790
 
-    if temp_1 < 373.15 < temp_2:
-        total_energy = energy_1 + energy_2 + heat_vaporization
-    else:
-        total_energy = energy_1 + energy_2
+    total_energy = energy_1 + energy_2
+    total_energy = total_energy + np.where(
+        (temp_1 < 373.15) & (373.15 < temp_2), heat_vaporization, 0.0
+    )
 
     # per mol of H2
     total_energy = total_energy / h_2_h2o
     # considering heat recovery
-    total_energy = total_energy * (1 - h_rec)
+    total_energy = total_energy * (1 - np.asarray(h_rec, dtype=float))
 
     return total_energy / 1000
 
 
+def energy_steam_generation(temp_1, temp_2, h_2_h2o, celsius=True, h_rec=0.0):
+    """
+    Calculates the energy required to heat water, evaporate it and to generate steam at temperature "temp"
+    Assuming water at ambient pressure, boiling point 100 °C
+    :param temp_1:  initial temperature of water/steam
+    :param temp_2:  steam temperature
+    :param h_2_h2o: partial pressure ratio h2/h2o
+    :param celsius: if True, temperature values are assumed to be in degrees celsius
+    :param h_rec:   heat recovery efficiency, can be between 0 and 1
+    :return:        energy required to generate steam per mol of H2 in the product stream in kJ/mol
+    """
+    return float(
+        energy_steam_generation_vec(
+            temp_1, temp_2, h_2_h2o, celsius=celsius, h_rec=h_rec
+        )
+    )
+
+
+def dhf_h2o_vec(t_ox):
+    """
+    Array version of dhf_h2o, t_ox can be an array of any shape
+    https://webbook.nist.gov/cgi/cbook.cgi?ID=C7732185&Units=SI&Mask=1#Thermo-Gas
+    """
+    shomdat = shomate_select(
+        t_ox,
+        [1700],
+        [
+            [30.09200, 6.832514, 6.793435, -2.534480, 0.082139, -250.8810],
+            [41.96426, 8.622053, -1.499780, 0.098119, -11.15764, -272.1797],
+        ],
+        inclusive=True,
+    )
+    return shomate_h(t_ox, shomdat)
+
+
 def dhf_h2o(t_ox):
     """
     Gets the heat of formation of water for at certain temperature
@@ -1087,32 +1806,36 @@ def dhf_h2o(t_ox):
     H° = A*t + B*t2/2 + C*t3/3 + D*t4/4 − E/t + F
     https://webbook.nist.gov/cgi/cbook.cgi?ID=C7732185&Units=SI&Mask=1#Thermo-Gas
     """
+    return float(dhf_h2o_vec(t_ox))
 
-    if t_ox <= 1700:
-        a = 30.09200
-        b = 6.832514
-        c = 6.793435
-        d = -2.534480
-        e = 0.082139
-        f = -250.8810
 
-    else:
-        a = 41.96426
-        b = 8.622053
-        c = -1.499780
-        d = 0.098119
-        e = -11.15764
-        f = -272.1797
-
-    t_1000 = t_ox / 1000
-    return (
-        a * t_1000
-        + 0.5 * b * (t_1000**2)
-        + (1 / 3) * c * (t_1000**3)
-        + (1 / 4) * d * (t_1000**4)
-        - e / t_1000
-        + f
+def dh_co_co2_vec(t_ox):
+    """
+    Array version of dh_co_co2, t_ox can be an array of any shape
+    CO2: https://webbook.nist.gov/cgi/cbook.cgi?ID=C124389&Units=SI&Mask=1#Thermo-Gas
+    CO:  https://webbook.nist.gov/cgi/cbook.cgi?ID=C630080&Units=SI&Mask=1#Thermo-Gas
+    """
+    # CO2
+    shomdat_co2 = shomate_select(
+        t_ox,
+        [1200],
+        [
+            [24.99735, 55.18696, -33.69137, 7.948387, -0.136638, -403.6075],
+            [58.16639, 2.720074, -0.492289, 0.038844, -6.447293, -425.9186],
+        ],
+        inclusive=True,
+    )
+    # CO
+    shomdat_co = shomate_select(
+        t_ox,
+        [1300],
+        [
+            [25.56759, 6.096130, 4.054656, -2.671301, 0.131021, -118.0089],
+            [35.15070, 1.300095, -0.205921, 0.013550, -3.282780, -127.8375],
+        ],
+        inclusive=True,
     )
+    return shomate_h(t_ox, shomdat_co2) - shomate_h(t_ox, shomdat_co)
 
 
 def dh_co_co2(t_ox):
@@ -1125,60 +1848,7 @@ def dh_co_co2(t_ox):
     CO2: https://webbook.nist.gov/cgi/cbook.cgi?ID=C124389&Units=SI&Mask=1#Thermo-Gas
     CO:  https://webbook.nist.gov/cgi/cbook.cgi?ID=C630080&Units=SI&Mask=1#Thermo-Gas
     """
-    t_1000 = t_ox / 1000
-
-    # CO2
-    if t_ox <= 1200:
-        a = 24.99735
-        b = 55.18696
-        c = -33.69137
-        d = 7.948387
-        e = -0.136638
-        f = -403.6075
-
-    else:
-        a = 58.16639
-        b = 2.720074
-        c = -0.492289
-        d = 0.038844
-        e = -6.447293
-        f = -425.9186
-
-    hco2 = (
-        a * t_1000
-        + 0.5 * b * (t_1000**2)
-        + (1 / 3) * c * (t_1000**3)
-        + (1 / 4) * d * (t_1000**4)
-        - e / t_1000
-        + f
-    )
-    # CO
-    if t_ox <= 1300:
-        a = 25.56759
-        b = 6.096130
-        c = 4.054656
-        d = -2.671301
-        e = 0.131021
-        f = -118.0089
-
-    else:
-        a = 35.15070
-        b = 1.300095
-        c = -0.205921
-        d = 0.013550
-        e = -3.282780
-        f = -127.8375
-
-    hco = (
-        a * t_1000
-        + 0.5 * b * (t_1000**2)
-        + (1 / 3) * c * (t_1000**3)
-        + (1 / 4) * d * (t_1000**4)
-        - e / t_1000
-        + f
-    )
-
-    return hco2 - hco
+    return float(dh_co_co2_vec(t_ox))
 
 
 def energy_on_the_fly(
@@ -1228,49 +1898,41 @@ def energy_on_the_fly(
 
                         By default, this is always True and there is no way in the user front-end to change this.
                         However, this could be changed manually by the developers, if necessary.
+
+    :return:            EnergyResults, mapping of the twelve results to their rankings
     """
     if process == "Air Separation":
         p_ox_wscs = 1
 
-    # initialize result variables
-    result_val_ener_i = np.empty(6)
-    result_val_per_kg_redox = np.empty(6)
-    result_val_per_kg_wh_redox = np.empty(6)
-    result_val_per_kj_mol_prod = np.empty(6)
-    result_val_per_energy_l = np.empty(6)
-    result_val_per_energy_l_wh = np.empty(6)
-    result_val_efficiency = np.empty(2)
-    result_val_mol_prod_mol_red = np.empty(2)
-    result_val_l_prod_kg_red = np.empty(2)
-    result_val_g_prod_kg_red = np.empty(2)
-    result_val_delta_redox = np.empty(2)
-    result_val_mass_change = np.empty(2)
-
-    for rd in resdict[0]["energy_analysis"]:
-        chemical_energy = rd["Chemical Energy"] * 1000
-        energy_sensible = rd["Sensible Energy"]
-        t_ox = rd["T_ox"]
-        t_red = rd["T_red"]
-        t_mean = (t_ox + t_red) / 2
-        delta_1 = rd["delta_1"]
-        delta_2 = rd["delta_2"]
-        g_prod_kg_red = rd["g_prod_kg_red"]
-        l_prod_kg_red = rd["l_prod_kg_red"]
-        mass_redox_i = rd["mass_redox"]
-        mol_mass_ox = rd["mol_mass_ox"]
-        mol_prod_mol_red = rd["mol_prod_mol_red"]
-        # p_ox = rd["p_ox"] # TODO: is this supposed to be used anywhere?
-        p_red = rd["p_red"]
-        compstr = rd["compstr"]
-        prodstr = rd["prodstr"]
-        prodstr_alt = rd["prodstr_alt"]
-        unstable = rd["unstable"]
+    # one row per material, all results are calculated for all materials at once
+    rows = pd.DataFrame(resdict[0]["energy_analysis"])
+    delta_redox = rows["delta_2"].to_numpy(dtype=float) - rows["delta_1"].to_numpy(
+        dtype=float
+    )
+    mol_mass_ox = rows["mol_mass_ox"].to_numpy(dtype=float)
+    mol_prod_mol_red = rows["mol_prod_mol_red"].to_numpy(dtype=float)
+    prodstr = rows["prodstr"].iloc[-1]
+    prodstr_alt = rows["prodstr_alt"].iloc[-1]
+    # remove data of unstable compounds
+    invalid = rows["unstable"].to_numpy(dtype=bool) & bool(rem_unstable)
+    if process == "Water Splitting" and h_val not in ("low", "high"):
+        raise ValueError("heating_value must be either 'high' or 'low'")
+
+    # the results are only calculated once they are requested, see EnergyResults
+    @cache
+    def energies():
+        """columns: total, chemical, sensible, pumping and steam generation energy"""
+        chemical_energy = rows["Chemical Energy"].to_numpy(dtype=float) * 1000
+        energy_sensible = rows["Sensible Energy"].to_numpy(dtype=float)
+        t_mean = (
+            rows["T_ox"].to_numpy(dtype=float) + rows["T_red"].to_numpy(dtype=float)
+        ) / 2
 
         # chemical energy stored in products
         if process == "Water Splitting":
-            dh_wscs = dhf_h2o(t_mean) * mol_prod_mol_red
+            dh_wscs = dhf_h2o_vec(t_mean) * mol_prod_mol_red
         elif process == "CO2 Splitting":
-            dh_wscs = dh_co_co2(t_mean) * mol_prod_mol_red
+            dh_wscs = dh_co_co2_vec(t_mean) * mol_prod_mol_red
         else:
             dh_wscs = 0
 
@@ -1286,21 +1948,23 @@ def energy_on_the_fly(
             energy_pumping = (float(pump_ener) * mol_mass_ox) / 1000
         else:  # using mechanical envelope
             # per mol O
-            energy_pumping = mechanical_envelope(p_red=p_red)
+            energy_pumping = mechanical_envelope_vec(
+                rows["p_red"].to_numpy(dtype=float)
+            )
             # per mol material
             energy_pumping = energy_pumping * mol_prod_mol_red
 
         # steam generation
         if process == "Water Splitting" and h_rec_steam != 1:
-            energy_steam = mol_prod_mol_red * energy_steam_generation(
+            energy_steam = mol_prod_mol_red * energy_steam_generation_vec(
                 temp_1=w_feed,
-                temp_2=((t_ox + t_red) * 0.5) - 273.15,
+                temp_2=t_mean - 273.15,
                 h_2_h2o=p_ox_wscs,
                 celsius=celsius,
                 h_rec=h_rec_steam,
             )
         else:
-            energy_steam = 0
+            energy_steam = np.zeros(len(rows))
 
         # total energy
         energy_total = (
@@ -1309,8 +1973,7 @@ def energy_on_the_fly(
             + energy_pumping
             + energy_steam
         )
-
-        ener_i = np.array(
+        return np.column_stack(
             [
                 energy_total,
                 energy_integral_dh,
@@ -1320,160 +1983,192 @@ def energy_on_the_fly(
             ]
         )
 
-        # kJ/kg of redox material
-        per_kg_redox = (ener_i / mol_mass_ox) * 1000
-        # Wh/kg of redox material
-        per_kg_wh_redox = per_kg_redox / 3.6
-        # kJ/mol of product (O, H2, or CO)
-        kj_mol_prod = ener_i / (delta_2 - delta_1)
-        # kJ/L of product (ideal gas at SATP)
-        energy_l = kj_mol_prod / 24.465
+    # kJ/kg of redox material
+    def per_kg_redox():
+        return (energies() / mol_mass_ox[:, None]) * 1000
+
+    # Wh/kg of redox material
+    def per_kg_wh_redox():
+        return per_kg_redox() / 3.6
+
+    # kJ/mol of product (O, H2, or CO)
+    def kj_mol_prod():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return energies() / delta_redox[:, None]
+
+    # kJ/L of product (ideal gas at SATP)
+    def energy_l():
+        energy_l = kj_mol_prod() / 24.465
         # convert from O to O2
         if process == "Air Separation":
             energy_l = 2 * energy_l
-        # Wh/L of product (ideal gas at SATP)
-        energy_l_wh = energy_l / 3.6
+        return energy_l
+
+    # Wh/L of product (ideal gas at SATP)
+    def energy_l_wh():
+        return energy_l() / 3.6
+
+    # calculate efficiency for water splitting
+    def efficiency():
+        if process != "Water Splitting":
+            return np.full(len(rows), np.nan)
+        # source for heating values
+        # https://h2tools.org/node/3131
+        h_v = 119.96 if h_val == "low" else 141.88
+        # convert kJ/mol H2 to MJ/kg H2 -> divide by 2.016
+        with np.errstate(divide="ignore"):
+            return (h_v / (kj_mol_prod()[:, 0] / 2.016)) * 100
+
+    def column(name):
+        return lambda: rows[name].to_numpy(dtype=float)
+
+    # metric: (results, ascending, sorted)
+    metrics = {
+        "kJ/mol redox material": (energies, True, True),
+        "kJ/kg redox material": (per_kg_redox, True, True),
+        "Wh/kg redox material": (per_kg_wh_redox, True, True),
+        str("kJ/mol of " + prodstr_alt): (kj_mol_prod, True, True),
+        str("kJ/L of " + prodstr): (energy_l, True, True),
+        str("Wh/L of " + prodstr): (energy_l_wh, True, True),
+        "Heat to fuel efficiency in % (only valid for Water Splitting)": (
+            efficiency,
+            False,
+            process == "Water Splitting",
+        ),
+        str("mol " + prodstr_alt + " per mol redox material"): (
+            lambda: mol_prod_mol_red,
+            False,
+            True,
+        ),
+        str("L " + prodstr + " per mol redox material"): (
+            column("l_prod_kg_red"),
+            False,
+            True,
+        ),
+        str("g " + prodstr + " per mol redox material"): (
+            column("g_prod_kg_red"),
+            False,
+            True,
+        ),
+        "Change in non-stoichiometry between T_ox and T_red": (
+            lambda: delta_redox,
+            False,
+            True,
+        ),
+        "Mass change between T_ox and T_red": (column("mass_redox"), False, True),
+    }
+    return EnergyResults(metrics, rows["compstr"].to_numpy(), invalid)
 
-        # calculate efficiency for water splitting
-        if process == "Water Splitting":
-            # source for heating values
-            # https://h2tools.org/node/3131
-            if h_val == "low":
-                h_v = 119.96
-            elif h_val == "high":
-                h_v = 141.88
-            else:
-                raise ValueError("heating_value must be either 'high' or 'low'")
-            # convert kJ/mol H2 to MJ/kg H2 -> divide by 2.016
-            efficiency = (h_v / (kj_mol_prod[0] / 2.016)) * 100
-        else:
-            efficiency = None
-
-        delta_redox_i = float(delta_2 - delta_1)
-        mass_change_i = float(mass_redox_i)
-        compdisp = remove_comp_one(compstr=compstr)
-
-        invalid_val = False  # remove data of unstable compounds
-        if rem_unstable and unstable:
-            invalid_val = True
-
-        # append new values to result and add compositions
-        if (
-            ener_i[0] < 0
-        ) or invalid_val:  # sort out negative values, heat input is always positive
-            ener_i[0] = float("inf")
-        res_i = np.append(ener_i, compdisp)
-        result_val_ener_i = np.vstack((result_val_ener_i, res_i))
-
-        if per_kg_redox[0] < 0 or invalid_val:
-            per_kg_redox[0] = float("inf")
-        res_i = np.append(per_kg_redox, compdisp)
-        result_val_per_kg_redox = np.vstack((result_val_per_kg_redox, res_i))
-
-        if per_kg_wh_redox[0] < 0 or invalid_val:
-            per_kg_wh_redox[0] = float("inf")
-        res_i = np.append(per_kg_wh_redox, compdisp)
-        result_val_per_kg_wh_redox = np.vstack((result_val_per_kg_wh_redox, res_i))
-
-        if kj_mol_prod[0] < 0 or invalid_val:
-            kj_mol_prod[0] = float("inf")
-        res_i = np.append(kj_mol_prod, compdisp)
-        result_val_per_kj_mol_prod = np.vstack((result_val_per_kj_mol_prod, res_i))
-
-        if energy_l[0] < 0 or invalid_val:
-            energy_l[0] = float("inf")
-        res_i = np.append(energy_l, compdisp)
-        result_val_per_energy_l = np.vstack((result_val_per_energy_l, res_i))
-
-        if energy_l_wh[0] < 0 or invalid_val:
-            energy_l_wh[0] = float("inf")
-        res_i = np.append(energy_l_wh, compdisp)
-        result_val_per_energy_l_wh = np.vstack((result_val_per_energy_l_wh, res_i))
-
-        if efficiency:
-            if efficiency < 0 or invalid_val:
-                efficiency = float("-inf")
-        res_i = np.append(efficiency, compdisp)
-        result_val_efficiency = np.vstack((result_val_efficiency, res_i))
-
-        if mol_prod_mol_red < 0 or invalid_val:
-            mol_prod_mol_red = float("-inf")
-        res_i = np.append(mol_prod_mol_red, compdisp)
-        result_val_mol_prod_mol_red = np.vstack((result_val_mol_prod_mol_red, res_i))
-
-        if l_prod_kg_red < 0 or invalid_val:
-            l_prod_kg_red = float("-inf")
-        res_i = np.append(l_prod_kg_red, compdisp)
-        result_val_l_prod_kg_red = np.vstack((result_val_l_prod_kg_red, res_i))
-
-        if g_prod_kg_red < 0 or invalid_val:
-            g_prod_kg_red = float("-inf")
-        res_i = np.append(g_prod_kg_red, compdisp)
-        result_val_g_prod_kg_red = np.vstack((result_val_g_prod_kg_red, res_i))
-
-        if delta_redox_i < 0 or invalid_val:
-            delta_redox_i = float("-inf")
-        res_i = np.append(delta_redox_i, compdisp)
-        result_val_delta_redox = np.vstack((result_val_delta_redox, res_i))
-
-        if mass_change_i < 0 or invalid_val:
-            mass_change_i = float("-inf")
-        res_i = np.append(mass_change_i, compdisp)
-        result_val_mass_change = np.vstack((result_val_mass_change, res_i))
-
-    # sort results
-    result_val_ener_i = sorted(result_val_ener_i[1:], key=lambda x: float(x[0]))
-    result_val_per_kg_redox = sorted(
-        result_val_per_kg_redox[1:], key=lambda x: float(x[0])
-    )
-    result_val_per_kg_wh_redox = sorted(
-        result_val_per_kg_wh_redox[1:], key=lambda x: float(x[0])
-    )
-    result_val_per_kj_mol_prod = sorted(
-        result_val_per_kj_mol_prod[1:], key=lambda x: float(x[0])
-    )
-    result_val_per_energy_l = sorted(
-        result_val_per_energy_l[1:], key=lambda x: float(x[0])
-    )
-    result_val_per_energy_l_wh = sorted(
-        result_val_per_energy_l_wh[1:], key=lambda x: float(x[0])
-    )
-    if process == "Water Splitting":
-        result_val_efficiency = sorted(
-            result_val_efficiency[1:], key=lambda x: float(x[0]), reverse=True
-        )
-    else:
-        result_val_efficiency = result_val_efficiency[1:]
-    result_val_mol_prod_mol_red = sorted(
-        result_val_mol_prod_mol_red[1:], key=lambda x: float(x[0]), reverse=True
-    )
-    result_val_l_prod_kg_red = sorted(
-        result_val_l_prod_kg_red[1:], key=lambda x: float(x[0]), reverse=True
-    )
-    result_val_g_prod_kg_red = sorted(
-        result_val_g_prod_kg_red[1:], key=lambda x: float(x[0]), reverse=True
-    )
-    result_val_delta_redox = sorted(
-        result_val_delta_redox[1:], key=lambda x: float(x[0]), reverse=True
-    )
-    result_val_mass_change = sorted(
-        result_val_mass_change[1:], key=lambda x: float(x[0]), reverse=True
+
+# numeric columns of the energy rankings with five values per material (kJ/mol, kJ/kg, ...)
+ENERGY_COLUMNS = [
+    "Total Energy",
+    "Chemical Energy",
+    "Sensible Energy",
+    "Pumping Energy",
+    "Steam Generation",
+]
+
+
+def rank_energy_metric(values, materials, invalid, ascending=True):
+    """
+    Prepares the ranking of the materials by one result of energy_on_the_fly
+    Negative results and invalid (unstable) materials are ranked last by setting the ranked value to
+    inf (ascending, energies) or -inf (descending, efficiencies and yields)
+    :param values:      results per material, either one value or the five ENERGY_COLUMNS per material
+    :param materials:   label of each material
+    :param invalid:     True for materials to be ranked last
+    :param ascending:   if True, the lowest value is ranked first
+    :return:            DataFrame with the numeric column(s) "value" or ENERGY_COLUMNS and the label
+                        column "material" (not sorted yet), and the sort key (ascending)
+    """
+    values = np.array(values, dtype=float).reshape(len(materials), -1)
+    ranked = values[:, 0]
+    # results which are not available (NaN) are kept
+    ranked[((ranked < 0) | invalid) & ~np.isnan(ranked)] = (
+        float("inf") if ascending else float("-inf")
     )
+    columns = ENERGY_COLUMNS if values.shape[1] == len(ENERGY_COLUMNS) else ["value"]
+    ranking = pd.DataFrame(values, columns=columns)
+    ranking["material"] = materials
+    return ranking, (ranked if ascending else -ranked)
 
-    # create dictionary with results
-    return {
-        "kJ/mol redox material": result_val_ener_i,
-        "kJ/kg redox material": result_val_per_kg_redox,
-        "Wh/kg redox material": result_val_per_kg_wh_redox,
-        str("kJ/mol of " + prodstr_alt): result_val_per_kj_mol_prod,
-        str("kJ/L of " + prodstr): result_val_per_energy_l,
-        str("Wh/L of " + prodstr): result_val_per_energy_l_wh,
-        "Heat to fuel efficiency in % (only valid for Water Splitting)": result_val_efficiency,
-        str(
-            "mol " + prodstr_alt + " per mol redox material"
-        ): result_val_mol_prod_mol_red,
-        str("L " + prodstr + " per mol redox material"): result_val_l_prod_kg_red,
-        str("g " + prodstr + " per mol redox material"): result_val_g_prod_kg_red,
-        "Change in non-stoichiometry between T_ox and T_red": result_val_delta_redox,
-        "Mass change between T_ox and T_red": result_val_mass_change,
-    }
+
+def top_k_indices(sort_key, k):
+    """
+    Indices of the k smallest values of sort_key, in the same order as a stable full sort
+    Only the candidates found by np.argpartition are sorted
+    :param sort_key:    array of values, NaN values are placed last
+    :param k:           number of indices, all indices if None
+    :return:            array of indices
+    """
+    if k is None or k >= len(sort_key):
+        return np.argsort(sort_key, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=int)
+    kth = sort_key[np.argpartition(sort_key, k - 1)[k - 1]]
+    # keep ties with the k-th value in their original order
+    candidates = np.flatnonzero(sort_key <= kth)
+    if np.isnan(kth):
+        candidates = np.arange(len(sort_key))
+    return candidates[np.argsort(sort_key[candidates], kind="stable")][:k]
+
+
+class EnergyResults(Mapping):
+    """
+    Results of energy_on_the_fly, one ranking per metric
+    The rankings are only calculated when they are requested, either completely (results[metric],
+    e.g. for export) or only for the best materials (results.top(metric, k))
+    """
+
+    def __init__(self, metrics, compstr, invalid):
+        """
+        :param metrics:     dictionary metric: (function returning the results, ascending, sorted)
+        :param compstr:     composition of each material
+        :param invalid:     True for materials to be ranked last
+        """
+        self.metrics = metrics
+        self.compstr = compstr
+        self.invalid = invalid
+        self.rankings = {}
+
+    def __getitem__(self, metric):
+        if metric not in self.rankings:
+            self.rankings[metric] = self.top(metric, None)
+        return self.rankings[metric]
+
+    def __iter__(self):
+        return iter(self.metrics)
+
+    def __len__(self):
+        return len(self.metrics)
+
+    def top(self, metric, k, drop_duplicates=False):
+        """
+        Ranking of the k best materials for one metric, see rank_energy_metric
+        :param k:               number of materials, all materials if None
+        :param drop_duplicates: if True, duplicate rows are removed before selecting the k materials
+        :return:                DataFrame in the order of the ranking
+        """
+        results, ascending, sort = self.metrics[metric]
+        values = results()
+        # only the compositions of the selected materials are converted
+        ranking, sort_key = rank_energy_metric(
+            values, self.compstr, self.invalid, ascending=ascending
+        )
+        size = k
+        while True:
+            if sort:
+                selected = top_k_indices(sort_key, size)
+            else:
+                selected = np.arange(len(sort_key))[:size]
+            result = ranking.iloc[selected].reset_index(drop=True)
+            result["material"] = [
+                remove_comp_one(compstr=c) for c in result["material"]
+            ]
+            if not drop_duplicates:
+                return result
+            unique = result.drop_duplicates(ignore_index=True)
+            if k is None or len(unique) >= k or len(selected) == len(sort_key):
+                return unique.iloc[:k]
+            size = size + len(result) - len(unique)
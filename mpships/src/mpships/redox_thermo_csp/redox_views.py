@@ -3,25 +3,39 @@ from __future__ import unicode_literals
 import json
 import numpy as np
 from itertools import groupby
+from scipy.constants import R
 from scipy.optimize import brentq
 from mpships.redox_thermo_csp.redox_utils import (
     remove_comp_one,
     add_comp_one,
     rootfind,
+    rootfind_vec,
+    solve_bracketed,
+    resolve_bracketed,
     get_energy_data,
     energy_on_the_fly,
     s_th_o,
+    s_th_o_vec,
     dh_ds,
     funciso,
     funciso_redox,
-    funciso_theo,
     isobar_line_elling,
-    funciso_redox_theo,
-    d_h_num_dev_calc,
-    d_s_fundamental,
+    funciso_theo_vec,
+    funciso_redox_theo_vec,
+    delta_theo_closed_form,
+    isoredox_theo_closed_form,
+    sign_change_mask,
+    d_h_implicit,
+    p_o2_calc_vec,
+    d_s_fundamental_vec,
 )
 
 
+def _nan_to_none(values):
+    """convert an array of results to a list, replacing NaN (no solution found) with None"""
+    return [None if np.isnan(v) else float(v) for v in np.ravel(values)]
+
+
 class InitData:
     def init_load_json(filename="theo_data.json"):
         """
@@ -138,13 +152,38 @@ class InitData:
 
 
 class Isographs:
-    def __init__(self, compstr, plottype, iso, rng, a=1e-10, b=0.5 - 1e-10):
+    def __init__(
+        self,
+        compstr,
+        plottype,
+        iso,
+        rng,
+        a=1e-10,
+        b=0.5 - 1e-10,
+        theo_mode="closed_form",
+        exp_mode="parametric",
+    ):
+        """
+        :param theo_mode:   evaluation of the theoretical isographs, either "closed_form"
+                            (explicit evaluation via delta_mix, or ln(p_O2) from dH and dS for
+                            isoredox, on all x values) or "rootfind" (solving funciso_theo or
+                            funciso_redox_theo on every fourth x value)
+        :param exp_mode:    evaluation of the experimental isographs, either "parametric"
+                            (explicit ln(p_O2) as a function of delta, see experimental_parametric)
+                            or "rootfind" (solving funciso/funciso_redox for every x value)
+        """
+        if theo_mode not in ("closed_form", "rootfind"):
+            raise ValueError("theo_mode must be either 'closed_form' or 'rootfind'")
+        if exp_mode not in ("parametric", "rootfind"):
+            raise ValueError("exp_mode must be either 'parametric' or 'rootfind'")
         self.compstr = compstr
         self.plottype = plottype
         self.iso = iso
         self.rng = rng
         self.a = a
         self.b = b
+        self.theo_mode = theo_mode
+        self.exp_mode = exp_mode
 
     def prepare_limits(self):
         """Prepares x values and limits for the plots"""
@@ -170,24 +209,27 @@ class Isographs:
         if pars[
             "experimental_data_available"
         ]:  # only execute this if experimental data is available
-            for xv in x_val:  # calculate experimental data
-                try:
-                    if self.plottype == "isotherm":
-                        s_th = s_th_o(payload["iso"])
-                        args = (xv, payload["iso"], pars, s_th)
-                    else:
-                        s_th = s_th_o(xv)
-                        args = (payload["iso"], xv, pars, s_th)
-                    if self.plottype == "isoredox":
-                        solutioniso = brentq(funciso_redox, -300, 300, args=args)
-                        resiso.append(np.exp(solutioniso))
-                    else:
-                        solutioniso = rootfind(a, b, args, funciso)
-                        resiso.append(solutioniso)
-                except (
-                    ValueError
-                ):  # if brentq function finds no zero point due to plot out of range
-                    resiso.append(None)
+            if self.exp_mode == "parametric":
+                resiso = self.experimental_parametric(pars, payload, x_val)
+            else:
+                for xv in x_val:  # calculate experimental data
+                    try:
+                        if self.plottype == "isotherm":
+                            s_th = s_th_o(payload["iso"])
+                            args = (xv, payload["iso"], pars, s_th)
+                        else:
+                            s_th = s_th_o(xv)
+                            args = (payload["iso"], xv, pars, s_th)
+                        if self.plottype == "isoredox":
+                            solutioniso = brentq(funciso_redox, -300, 300, args=args)
+                            resiso.append(np.exp(solutioniso))
+                        else:
+                            solutioniso = rootfind(a, b, args, funciso)
+                            resiso.append(solutioniso)
+                    except (
+                        ValueError
+                    ):  # if brentq function finds no zero point due to plot out of range
+                        resiso.append(None)
             # show interpolation
             res_interp, res_fit = [], []
             for i in range(len(resiso)):
@@ -209,54 +251,52 @@ class Isographs:
                 None,
             )  # don't plot any experimental data if it is not available
 
-        try:  # calculate theoretical data
-            for xv in x_val[
+        # calculate theoretical data for all x values at once
+        if self.theo_mode == "closed_form":
+            x_val_theo = x_val
+        else:
+            x_val_theo = x_val[
                 ::4
-            ]:  # use less data points for theoretical graphs to improve speed
-                if self.plottype == "isotherm":
-                    args_theo = (
-                        xv,
-                        payload["iso"],
-                        pars,
-                        pars["td_perov"],
-                        pars["td_brownm"],
-                        pars["dh_min"] * 1000,
-                        pars["dh_max"] * 1000,
-                        pars["act_mat"],
-                    )
-                else:
-                    args_theo = (
-                        payload["iso"],
-                        xv,
-                        pars,
-                        pars["td_perov"],
-                        pars["td_brownm"],
-                        pars["dh_min"] * 1000,
-                        pars["dh_max"] * 1000,
-                        pars["act_mat"],
-                    )
-                if self.plottype == "isoredox":
-                    try:
-                        solutioniso_theo = brentq(
-                            funciso_redox_theo, -300, 300, args=args_theo
-                        )
-                    except ValueError:
-                        solutioniso_theo = brentq(
-                            funciso_redox_theo, -100, 100, args=args_theo
-                        )
-                    resiso_theo.append(np.exp(solutioniso_theo))
-                else:
-                    solutioniso_theo = rootfind(a, b, args_theo, funciso_theo)
-                    resiso_theo.append(solutioniso_theo)
-        except (
-            ValueError
-        ):  # if brentq function finds no zero point due to plot out of range
-            resiso_theo.append(None)
+            ]  # use less data points for theoretical graphs to improve speed
+        if self.plottype == "isotherm":
+            iso_theo, x_theo_val = x_val_theo, payload["iso"]
+        else:
+            iso_theo, x_theo_val = payload["iso"], x_val_theo
+        args_theo = (
+            iso_theo,
+            x_theo_val,
+            pars,
+            pars["td_perov"],
+            pars["td_brownm"],
+            pars["dh_min"] * 1000,
+            pars["dh_max"] * 1000,
+            pars["act_mat"],
+        )
+        if self.plottype == "isoredox" and self.theo_mode == "closed_form":
+            solutioniso_theo = isoredox_theo_closed_form(
+                iso_theo, x_theo_val, *args_theo[3:]
+            )
+        elif self.plottype == "isoredox":
+            solutioniso_theo = solve_bracketed(
+                funciso_redox_theo_vec, -300, 300, args=args_theo
+            )
+            solutioniso_theo = resolve_bracketed(
+                funciso_redox_theo_vec, solutioniso_theo, -100, 100, args=args_theo
+            )
+            solutioniso_theo = np.exp(solutioniso_theo)
+        elif self.theo_mode == "closed_form":
+            solutioniso_theo = delta_theo_closed_form(
+                iso_theo, x_theo_val, *args_theo[3:], a=a, b=b
+            )
+        else:
+            solutioniso_theo = rootfind_vec(a, b, args_theo, funciso_theo_vec)
+        resiso_theo = _nan_to_none(solutioniso_theo)
         if self.plottype == "isotherm":
             x = list(np.exp(x_val))
+            x_theo = list(np.exp(x_val_theo))
         else:
             x = list(x_val)
-        x_theo = x[::4]
+            x_theo = list(x_val_theo)
         x_exp = None
         if pars["experimental_data_available"]:
             x_exp = x
@@ -289,6 +329,71 @@ class Isographs:
         ]
         return response
 
+    def experimental_parametric(self, pars, payload, x_val):
+        """
+        Evaluates the experimental isographs for all x values at once, with the same results as rootfind
+        funciso and funciso_redox are linear in ln(p_O2), so for a given delta and T, ln(p_O2)
+        follows explicitly from dh and ds. Isoredox curves are therefore calculated directly.
+        For isotherms and isobars, funciso is sampled on a grid of delta values within the bracket
+        rootfind uses ([0.01, 0.49] if funciso changes its sign between these limits, else [a, b]).
+        If the bracket contains a single sign change, the root is solved between the enclosing grid
+        points, otherwise brentq is used on the bracket like in rootfind, as it may return any root
+        :return:    list of results (delta, or p_O2 for isoredox), None if no solution is found
+        """
+        a, b = self.a, self.b
+        if self.plottype == "isoredox":
+            dh, ds = dh_ds(payload["iso"], s_th_o_vec(x_val), pars)
+            p_o2_l = -2 * (dh - x_val * ds) / (R * x_val)
+            # same range as the brackets used for funciso_redox
+            return _nan_to_none(np.where(np.abs(p_o2_l) <= 300, np.exp(p_o2_l), np.nan))
+
+        iso, temp = np.broadcast_arrays(
+            *(
+                (x_val, payload["iso"])
+                if self.plottype == "isotherm"
+                else (payload["iso"], x_val)
+            )
+        )
+        s_th = s_th_o_vec(temp)
+        args = (iso[:, None], temp[:, None], pars, s_th[:, None])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f_lim = funciso(np.array([0.01, 0.49, a, b]), *args)
+        first = f_lim[:, 0] * f_lim[:, 1] <= 0
+        found = first | (f_lim[:, 2] * f_lim[:, 3] <= 0)
+        lower = np.where(first, 0.01, a)[:, None]
+        upper = np.where(first, 0.49, b)[:, None]
+
+        # grid equidistant in logit(2 * delta), i.e. denser towards a and b, limited to the bracket
+        u = np.linspace(np.log(a / (0.5 - a)), np.log(b / (0.5 - b)), 961)
+        delta = np.clip(0.5 / (1 + np.exp(-u)), lower, upper)
+        delta[:, 0], delta[:, -1] = lower[:, 0], upper[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f_grid = funciso(delta, *args)
+        change = sign_change_mask(f_grid, delta, lower, upper)
+        single = found & np.isfinite(f_grid).all(axis=-1) & (change.sum(axis=-1) == 1)
+
+        k = np.argmax(change, axis=-1)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            solution = solve_bracketed(
+                funciso,
+                np.take_along_axis(delta, k, axis=-1)[:, 0],
+                np.take_along_axis(delta, k + 1, axis=-1)[:, 0],
+                args=(iso, temp, pars, s_th),
+            )
+        solution[~single] = np.nan
+        # several roots (or values which are not finite) within the bracket
+        for i in np.flatnonzero(found & ~single):
+            try:
+                solution[i] = brentq(
+                    funciso,
+                    lower[i, 0],
+                    upper[i, 0],
+                    args=(iso[i], temp[i], pars, s_th[i]),
+                )
+            except ValueError:
+                pass
+        return _nan_to_none(solution)
+
     def enthalpy_entropy(self, pars, payload, x_val):
         resiso, resiso_theo = [], []
         if pars[
@@ -326,63 +431,45 @@ class Isographs:
                 None,
             )  # don't plot any experimental data if it is not available
 
-        try:  # calculate theoretical data
-            for xv in x_val[
-                ::4
-            ]:  # use less data points for theoretical graphs to improve speed
-                (
-                    payload["iso"],
-                    xv,
-                    pars,
-                    pars["td_perov"],
-                    pars["td_brownm"],
-                    pars["dh_min"] * 1000,
-                    pars["dh_max"] * 1000,
-                    pars["act_mat"],
-                )
-                if self.plottype == "dH":
-                    solutioniso_theo = (
-                        d_h_num_dev_calc(
-                            delta=xv,
-                            dh_1=pars["dh_min"] * 1000,
-                            dh_2=pars["dh_max"] * 1000,
-                            temp=payload["iso"],
-                            act=pars["act_mat"],
-                        )
-                        / 1000
-                    )
-                else:
-                    solutioniso_theo = d_s_fundamental(
-                        delta=xv,
-                        dh_1=pars["dh_min"] * 1000,
-                        dh_2=pars["dh_max"] * 1000,
-                        temp=payload["iso"],
-                        act=pars["act_mat"],
-                        t_d_perov=pars["td_perov"],
-                        t_d_brownm=pars["td_brownm"],
-                    )
-                resiso_theo.append(solutioniso_theo)
-        except (
-            ValueError
-        ):  # if brentq function finds no zero point due to plot out of range
-            resiso_theo.append(None)
+        # calculate theoretical data, dH follows analytically from ln(p_O2) at each delta
+        dh_1, dh_2 = pars["dh_min"] * 1000, pars["dh_max"] * 1000
+        p_o2_l = np.log(
+            p_o2_calc_vec(x_val, dh_1, dh_2, payload["iso"], pars["act_mat"])
+        )
+        if self.plottype == "dH":
+            solutioniso_theo = (
+                d_h_implicit(payload["iso"], p_o2_l, dh_1, dh_2, pars["act_mat"]) / 1000
+            )
+        else:
+            solutioniso_theo = d_s_fundamental_vec(
+                delta=x_val,
+                dh_1=dh_1,
+                dh_2=dh_2,
+                temp=payload["iso"],
+                act=pars["act_mat"],
+                t_d_perov=pars["td_perov"],
+                t_d_brownm=pars["td_brownm"],
+                p_o2_l=p_o2_l,
+            )
+        resiso_theo = _nan_to_none(solutioniso_theo)
 
         x = list(x_val)
-        x_theo = x[::4]
+        x_theo = x
         x_exp = None
         if pars["experimental_data_available"]:
             x_exp = x
 
-        # limiting values for the plot,
-        y_max = max(np.append(resiso, resiso_theo)) * 1.2
+        # limiting values for the plot, points without a solution are ignored
+        values = np.array(list(resiso) + resiso_theo, dtype=float)
+        y_max = np.nanmax(values) * 1.2
         if self.plottype == "dH":
-            if max(np.append(resiso, resiso_theo)) > (pars["dh_max"] * 1000 * 0.0015):
+            if np.nanmax(values) > (pars["dh_max"] * 1000 * 0.0015):
                 y_max = pars["dh_max"] * 1000 * 0.0015
         else:
-            if max(np.append(resiso, resiso_theo)) > 250:
+            if np.nanmax(values) > 250:
                 y_max = 250
-        if self.plottype == "dH" and min(np.append(resiso, resiso_theo)) > -10:
-            y_min = min(np.append(resiso, resiso_theo)) * 0.8
+        if self.plottype == "dH" and np.nanmin(values) > -10:
+            y_min = np.nanmin(values) * 0.8
         else:
             y_min = -10
         response = [
@@ -454,35 +541,24 @@ class Isographs:
                 None,
             )  # don't plot any experimental data if it is not available
 
-        try:  # calculate theoretical data
-            for xv in x_val[
-                ::4
-            ]:  # use less data points for theoretical graphs to improve speed
-                dh = d_h_num_dev_calc(
-                    delta=delta,
-                    dh_1=pars["dh_min"] * 1000,
-                    dh_2=pars["dh_max"] * 1000,
-                    temp=xv,
-                    act=pars["act_mat"],
-                )
-                ds = d_s_fundamental(
-                    delta=delta,
-                    dh_1=pars["dh_min"] * 1000,
-                    dh_2=pars["dh_max"] * 1000,
-                    temp=xv,
-                    act=pars["act_mat"],
-                    t_d_perov=pars["td_perov"],
-                    t_d_brownm=pars["td_brownm"],
-                )
-                solutioniso_theo = (dh - ds * xv) / 1000
-                resiso_theo.append(solutioniso_theo)
-        except (
-            ValueError
-        ):  # if brentq function finds no zero point due to plot out of range
-            resiso_theo.append(None)
+        # calculate theoretical data, dH follows analytically from ln(p_O2) at each temperature
+        dh_1, dh_2 = pars["dh_min"] * 1000, pars["dh_max"] * 1000
+        p_o2_l = np.log(p_o2_calc_vec(delta, dh_1, dh_2, x_val, pars["act_mat"]))
+        dh = d_h_implicit(x_val, p_o2_l, dh_1, dh_2, pars["act_mat"])
+        ds = d_s_fundamental_vec(
+            delta=delta,
+            dh_1=dh_1,
+            dh_2=dh_2,
+            temp=x_val,
+            act=pars["act_mat"],
+            t_d_perov=pars["td_perov"],
+            t_d_brownm=pars["td_brownm"],
+            p_o2_l=p_o2_l,
+        )
+        resiso_theo = _nan_to_none((dh - ds * x_val) / 1000)
 
         x = list(x_val)
-        x_theo = x[::4]
+        x_theo = x
         if pars["experimental_data_available"]:
             x_exp = x
         else:
@@ -585,7 +661,8 @@ def energy_analysis(en_dat, payload):
             param_disp = str("L " + prodstr + " per mol redox material")
         elif param_disp == "g product per mol redox material":
             param_disp = str("g " + prodstr + " per mol redox material")
-        result = results[param_disp]
+        # only the displayed metric is ranked, and only for the displayed materials
+        result = results.top(param_disp, cutoff, drop_duplicates=True)
 
         commonname = (
             param_disp
@@ -622,28 +699,16 @@ def energy_analysis(en_dat, payload):
                 + " bar"
             )
 
-        # remove duplicates (if any)
-        rem_pos = -1
-        for elem in range(len(result)):
-            if elem > 0 and (result[elem][-1] == result[elem - 1][-1]):
-                to_remove = result[elem]
-                rem_pos = elem
-        if rem_pos > -1:
-            result = [i for i in result if str(i) != str(to_remove)]
-            result.insert(rem_pos - 1, to_remove)
-
-        result = [
-            i for i in result if "inf" not in str(i[0])
-        ]  # this removes all inf values
-        result_part = result[:cutoff] if cutoff < len(result) else result
+        # inf values are ranked last, this removes all of them
+        result_part = result[~np.isinf(result.iloc[:, 0])]
+        if result_part.empty:  # if the complete dict only shows inf, create empty graph
+            return response
 
         if (
-            len(result_part[0]) == 2
+            len(result_part.columns) == 2
         ):  # output if only one y-value per material is displayed
-            response[0]["x"] = [i[-1] for i in result_part]
-            response[0]["y"] = (
-                np.array([i[0] for i in result_part]).astype(float).tolist()
-            )
+            response[0]["x"] = result_part["material"].tolist()
+            response[0]["y"] = result_part["value"].tolist()
             response[0]["name"] = param_disp
             if "non-stoichiometry" in param_disp:
                 response[0]["name"] = (
@@ -655,30 +720,16 @@ def energy_analysis(en_dat, payload):
                 response[0]["name"] = "Heat to fuel efficiency (%)"
 
         else:  # display multiple values (such as chemical energy, sensible energy, ...)
-            response[0]["x"] = [i[-1] for i in result_part]
-            response[0]["y"] = (
-                np.array([i[1] for i in result_part]).astype(float).tolist()
-            )
-            response[0]["name"] = "Chemical Energy"
-            response[1]["x"] = [i[-1] for i in result_part]
-            response[1]["y"] = (
-                np.array([i[2] for i in result_part]).astype(float).tolist()
-            )
-            response[1]["name"] = "Sensible Energy"
-            response[2]["x"] = [i[-1] for i in result_part]
-            response[2]["y"] = (
-                np.array([i[3] for i in result_part]).astype(float).tolist()
-            )
-            response[2]["name"] = "Pumping Energy"
+            components = ["Chemical Energy", "Sensible Energy", "Pumping Energy"]
             if payload["process_type"] == "Water Splitting":
-                response[3]["x"] = [i[-1] for i in result_part]
-                response[3]["y"] = (
-                    np.array([i[4] for i in result_part]).astype(float).tolist()
-                )
-                response[3]["name"] = "Steam Generation"
+                components.append("Steam Generation")
+            for resp, component in zip(response, components):
+                resp["x"] = result_part["material"].tolist()
+                resp["y"] = result_part[component].tolist()
+                resp["name"] = component
         response[0].update({"title": titlestr, "yaxis_title": param_disp})
 
-    except IndexError:  # if the complete dict only shows inf, create empty graph
+    except IndexError:  # if no energy analysis data is available, create empty graph
         pass
 
     return response
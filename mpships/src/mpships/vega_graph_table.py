@@ -68,14 +68,13 @@ class VegaGraphTableAIO(html.Div):
             raise PreventUpdate
         brush_selection = signal_data.get("brush_selection", {})
 
-        df = redis_store.load(store_data["df"])
         if brush_selection:
-            filter = " and ".join(
-                [f"{v[0]} <= `{k}` <= {v[1]}" for k, v in brush_selection.items()]
+            filtered_source = redis_store.load_filtered(
+                store_data["df"],
+                ranges={k: (v[0], v[1]) for k, v in brush_selection.items()},
             )
-            filtered_source = df.query(filter)
         else:
-            filtered_source = df
+            filtered_source = redis_store.load(store_data["df"])
         return filtered_source.to_dict("records")
 
 
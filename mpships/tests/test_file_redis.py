@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.file_redis`."""
+
+
+import multiprocessing
+import sqlite3
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from redis.exceptions import ResponseError
+
+from mpships.file_redis import FileRedis
+from mpships.redis_store import LocalCache, redis_store
+
+
+def _save_and_load(url, value, hash_keys):
+    """Saves value and loads hash_keys with redis_store in a worker process"""
+    redis_store.configure(url)
+    redis_store.local_cache = LocalCache(max_bytes=0)
+    return redis_store.save(value), [redis_store.load(k) for k in hash_keys]
+
+
+def _get(url, key):
+    return FileRedis.from_url(url).get(key)
+
+
+def _set(url, key, value):
+    return FileRedis.from_url(url).set(key, value)
+
+
+class TestFileRedis(unittest.TestCase):
+    """Tests for the Redis commands of `FileRedis`."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"file://{self.directory.name}"
+        self.r = FileRedis.from_url(self.url)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_strings(self):
+        self.assertTrue(self.r.set("a", "1"))
+        self.assertIsNone(self.r.set("a", "2", nx=True))
+        self.assertEqual(self.r.get("a"), b"1")
+        self.assertEqual(self.r.mget(["a", "b"]), [b"1", None])
+        self.assertEqual(self.r.exists("a", "b"), 1)
+        self.assertEqual(self.r.delete("a", "b"), 1)
+        self.assertIsNone(self.r.get("a"))
+
+    def test_hashes(self):
+        self.assertEqual(self.r.hset("h", mapping={"x": 1, "y": b"\0"}), 2)
+        self.assertFalse(self.r.hsetnx("h", "x", 2))
+        self.assertEqual(self.r.hmget("h", ["x", "y", "z"]), [b"1", b"\0", None])
+        self.assertEqual(self.r.hincrby("h", "x", 5), 6)
+        self.assertEqual(self.r.hgetall("h"), {b"x": b"6", b"y": b"\0"})
+        self.assertEqual(self.r.hdel("h", "x", "z"), 1)
+        self.assertEqual(self.r.hlen("h"), 1)
+
+    def test_sorted_sets(self):
+        self.assertEqual(self.r.zadd("z", {"a": 3, "b": 1, "c": 2}), 3)
+        self.assertEqual(self.r.zadd("z", {"a": 0, "d": 5}, xx=True), 0)
+        self.assertEqual(self.r.zrange("z", 0, -1), [b"a", b"b", b"c"])
+        self.assertEqual(self.r.zrange("z", 1, 1), [b"b"])
+        self.assertEqual(self.r.zrange("z", -2, -1), [b"b", b"c"])
+        self.assertEqual(self.r.zrem("z", "a", "d"), 1)
+        self.assertEqual(self.r.zcard("z"), 2)
+
+    def test_expiry(self):
+        self.r.set("a", "1", ex=100)
+        self.assertEqual(self.r.ttl("a"), 100)
+        self.assertTrue(self.r.persist("a"))
+        self.assertEqual(self.r.ttl("a"), -1)
+        self.assertEqual(self.r.ttl("b"), -2)
+        self.r.hset("h", "x", 1)
+        self.r.expire("h", 0.05)
+        time.sleep(0.1)
+        self.assertEqual(self.r.hgetall("h"), {})
+        self.assertEqual(self.r.exists("h"), 0)
+
+    def test_renamenx(self):
+        self.r.hset("src", "x", 1)
+        self.r.set("dst", 1)
+        self.assertFalse(self.r.renamenx("src", "dst"))
+        self.r.delete("dst")
+        self.assertTrue(self.r.renamenx("src", "dst"))
+        self.assertEqual(self.r.hget("dst", "x"), b"1")
+        with self.assertRaises(ResponseError):
+            self.r.renamenx("src", "dst")
+
+    def test_pipeline(self):
+        pipe = self.r.pipeline()
+        pipe.set("a", 1)
+        pipe.hset("h", "x", 2)
+        pipe.renamenx("missing", "b")
+        results = pipe.execute(raise_on_error=False)
+        self.assertEqual(results[:2], [True, 1])
+        self.assertIsInstance(results[2], ResponseError)
+        # a failing pipeline is rolled back as a whole
+        pipe.set("c", 1)
+        pipe.renamenx("missing", "b")
+        with self.assertRaises(ResponseError):
+            pipe.execute()
+        self.assertIsNone(self.r.get("c"))
+        self.assertEqual(self.r.get("a"), b"1")
+
+
+class TestFileRedisProcesses(unittest.TestCase):
+    """Tests for sharing a `FileRedis` directory between processes."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"file://{self.directory.name}"
+        self.executor = ProcessPoolExecutor(
+            4, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.directory.cleanup()
+
+    def test_shared_entries(self):
+        redis_store.configure(self.url)
+        previous = redis_store.local_cache
+        redis_store.local_cache = LocalCache(max_bytes=0)
+        try:
+            df = pd.DataFrame({"x": np.arange(1000.0)})
+            parent_key = redis_store.save(df)
+            values = [{"worker": i, "x": np.arange(i)} for i in range(8)]
+            futures = [
+                self.executor.submit(_save_and_load, self.url, value, [parent_key])
+                for value in values
+            ]
+            for value, future in zip(values, futures):
+                hash_key, (loaded,) = future.result()
+                pd.testing.assert_frame_equal(loaded, df)
+                saved = redis_store.load(hash_key)
+                self.assertEqual(saved["worker"], value["worker"])
+                np.testing.assert_array_equal(saved["x"], value["x"])
+        finally:
+            redis_store.configure()
+            redis_store.local_cache = previous
+
+    def test_shared_expiry(self):
+        r = FileRedis.from_url(self.url)
+        r.set("a", "1", ex=0.5)
+        self.assertEqual(self.executor.submit(_get, self.url, "a").result(), b"1")
+        time.sleep(0.6)
+        self.assertIsNone(self.executor.submit(_get, self.url, "a").result())
+        # the next write of any process deletes the expired key
+        self.assertTrue(self.executor.submit(_set, self.url, "b", "2").result())
+        with sqlite3.connect(r.path) as db:
+            keys = db.execute("SELECT key FROM strings").fetchall()
+        self.assertEqual(keys, [("b",)])
@@ -0,0 +1,600 @@
+#!/usr/bin/env python
+
+"""Tests for `mpships.redis_store`."""
+
+
+import asyncio
+import importlib.util
+import io
+import json
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from mpships.redis_store import CODECS, LocalCache, MemoStats, redis_store
+
+
+class TestRedisStore(unittest.TestCase):
+    """Tests for saving and loading with `redis_store` against fakeredis."""
+
+    url = "fakeredis://"
+
+    def setUp(self):
+        redis_store.configure(self.url)
+        attributes = {
+            "local_cache": LocalCache(max_bytes=0),
+            "ttl": {},
+            "max_bytes": None,
+            "chunk_rows": None,
+        }
+        self.previous = {name: getattr(redis_store, name) for name in attributes}
+        for name, value in attributes.items():
+            setattr(redis_store, name, value)
+        self.df = pd.DataFrame(
+            {"x": np.arange(100.0), "y": np.random.rand(100), "s": ["a", "b"] * 50}
+        )
+
+    def tearDown(self):
+        redis_store.configure()
+        for name, value in self.previous.items():
+            setattr(redis_store, name, value)
+
+    def test_fingerprint_dedup(self):
+        hash_key, hit = redis_store.save(self.df, return_hit=True)
+        self.assertFalse(hit)
+        self.assertEqual(
+            redis_store.save(self.df.copy(), return_hit=True), (hash_key, True)
+        )
+        pd.testing.assert_frame_equal(redis_store.load(hash_key), self.df)
+
+        # frames that pandas hashes alike must not share an entry
+        ints = pd.DataFrame({"x": pd.Series([1, 2], dtype=object)})
+        strings = pd.DataFrame({"x": pd.Series(["1", "2"], dtype=object)})
+        self.assertNotEqual(
+            redis_store.fingerprint(ints), redis_store.fingerprint(strings)
+        )
+        redis_store.save(ints)
+        self.assertEqual(
+            redis_store.load(redis_store.save(strings))["x"].tolist(), ["1", "2"]
+        )
+        named = self.df.rename_axis("i")
+        self.assertNotEqual(redis_store.save(named), hash_key)
+        self.assertEqual(redis_store.load(redis_store.save(named)).index.name, "i")
+        self.assertIsNone(redis_store.fingerprint(pd.DataFrame({"x": [[1], [2]]})))
+
+    def sizes(self):
+        sizes = redis_store.r.hgetall(redis_store._sizes_key())
+        return {k.decode("utf-8"): int(v) for k, v in sizes.items()}
+
+    def test_ttl_and_lru_eviction(self):
+        redis_store.ttl = {"pickle": 100}
+        hash_key = redis_store.save({"a": 0})
+        self.assertGreater(redis_store.r.ttl(redis_store._key(hash_key)), 0)
+        # no bookkeeping without max_bytes
+        self.assertFalse(
+            redis_store.r.exists(redis_store._lru_key(), redis_store._sizes_key())
+        )
+
+        redis_store.max_bytes = 2**20
+        a, b, c = [redis_store.save({"a": i}) for i in range(1, 4)]
+        redis_store.load(a)
+        size = self.sizes()[a]
+        # room for three entries, b is the least recently used
+        redis_store.max_bytes = 3 * size
+        d = redis_store.save({"a": 4})
+        with self.assertRaises(KeyError):
+            redis_store.load(b)
+        for hash_key in [a, c, d]:
+            redis_store.load(hash_key)
+        self.assertEqual(set(self.sizes()), {a, c, d, "total"})
+        self.assertEqual(self.sizes()["total"], 3 * size)
+
+        # entries that expired are dropped from the bookkeeping, not counted
+        redis_store.r.delete(redis_store._key(a), redis_store._key(c))
+        e = redis_store.save({"a": 5})
+        self.assertEqual(set(self.sizes()), {d, e, "total"})
+        f = redis_store.save({"a": 6})
+        self.assertEqual(set(self.sizes()), {d, e, f, "total"})
+        self.assertEqual(self.sizes()["total"], 3 * size)
+        self.assertEqual(redis_store.r.zcard(redis_store._lru_key()), 3)
+        for hash_key in [d, e, f]:
+            redis_store.load(hash_key)
+
+    def test_sliding_expiry(self):
+        redis_store.ttl = {"pickle": 100}
+        hash_key = redis_store.save({"a": 0})
+        key = redis_store._key(hash_key)
+        redis_store.r.expire(key, 10)
+        # refreshed in the pipeline of the fetch
+        with mock.patch.object(redis_store.r, "expire", side_effect=AssertionError):
+            redis_store.load(hash_key)
+        self.assertGreater(redis_store.r.ttl(key), 10)
+        # or after it, on the first load of the entry in this process
+        redis_store.r.expire(key, 10)
+        redis_store._entry_ttls.clear()
+        redis_store.load(hash_key)
+        self.assertGreater(redis_store.r.ttl(key), 10)
+
+    def test_legacy_keys(self):
+        # entries saved as separate type and value keys, DataFrames as gzip Parquet
+        buffer = io.BytesIO()
+        self.df.to_parquet(buffer, compression="gzip")
+        redis_store.r.set("_dash_aio_components_value_df", buffer.getvalue())
+        redis_store.r.set("_dash_aio_components_type_df", "pd.DataFrame")
+        redis_store.r.set("_dash_aio_components_value_json", json.dumps({"a": [1, 2]}))
+        redis_store.r.set("_dash_aio_components_type_json", "json-serialized")
+        pd.testing.assert_frame_equal(redis_store.load("df"), self.df)
+        pd.testing.assert_frame_equal(
+            redis_store.load("df", columns=["y"]), self.df[["y"]]
+        )
+        self.assertEqual(redis_store.load("json"), {"a": [1, 2]})
+        loaded = redis_store.load_many(["json", "df"])
+        self.assertEqual(loaded[0], {"a": [1, 2]})
+        pd.testing.assert_frame_equal(loaded[1], self.df)
+
+    def test_eviction_deletes_fingerprint_keys(self):
+        redis_store.max_bytes = 2**20
+        hash_key = redis_store.save(self.df)
+        fingerprint_key = redis_store._fingerprint_key(
+            redis_store.fingerprint(self.df), redis_store.codec
+        )
+        self.assertEqual(redis_store.r.get(fingerprint_key).decode("utf-8"), hash_key)
+        redis_store.max_bytes = 1
+        redis_store.save({"a": 1})
+        self.assertFalse(redis_store.r.exists(fingerprint_key))
+        self.assertFalse(redis_store.r.exists(redis_store._key(hash_key)))
+
+    def test_load_filtered_and_chunks(self):
+        df = pd.DataFrame(
+            {"x": np.arange(10000.0), "y": np.random.rand(10000)},
+            index=np.arange(10000) * 2,
+        )
+        ranges = {"x": (100, 5000), "y": (0.2, 0.8)}
+        expected = df[df["x"].between(100, 5000) & df["y"].between(0.2, 0.8)]
+        hash_key = redis_store.save(df)
+        pd.testing.assert_frame_equal(
+            redis_store.load_filtered(hash_key, ranges), expected
+        )
+
+        # another codec, so that the fingerprint does not find the whole entry
+        chunked = redis_store.save(df, codec="parquet-gzip", chunk_rows=3000)
+        self.assertEqual(
+            [len(chunk) for chunk in redis_store.load_chunks(chunked)],
+            [3000, 3000, 3000, 1000],
+        )
+        pd.testing.assert_frame_equal(redis_store.load(chunked), df)
+        pd.testing.assert_frame_equal(
+            redis_store.load(chunked, columns=["y"]), df[["y"]]
+        )
+        pd.testing.assert_frame_equal(
+            redis_store.load_filtered(chunked, ranges), expected
+        )
+
+    def test_many(self):
+        values = [self.df, {"b": np.arange(3)}, [1, "a"], self.df.iloc[::-1], {1j}]
+        hash_keys = redis_store.save_many(values)
+        self.assertEqual(hash_keys[0], redis_store.save(self.df))
+        loaded = redis_store.load_many(hash_keys + ["missing"])
+        pd.testing.assert_frame_equal(loaded[0], values[0])
+        np.testing.assert_array_equal(loaded[1]["b"], values[1]["b"])
+        self.assertEqual(loaded[2], values[2])
+        pd.testing.assert_frame_equal(loaded[3], values[3])
+        self.assertEqual(loaded[4], values[4])
+        # failed items are returned in place
+        self.assertIsInstance(loaded[5], KeyError)
+        self.assertIsInstance(redis_store.save_many([object()])[0], TypeError)
+        pd.testing.assert_frame_equal(
+            redis_store.load_many(hash_keys[:1], columns=["s"])[0], self.df[["s"]]
+        )
+
+    def test_save_view(self):
+        parent = redis_store.save(self.df)
+        view, hit = redis_store.save_view(parent, [5, 3, 3, 70], return_hit=True)
+        self.assertFalse(hit)
+        expected = self.df.iloc[[3, 5, 70]]
+        pd.testing.assert_frame_equal(redis_store.load(view), expected)
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[[3, 5, 70]] = True
+        self.assertEqual(
+            redis_store.save_view(parent, mask, return_hit=True), (view, True)
+        )
+        pd.testing.assert_frame_equal(
+            redis_store.load(view, columns=["x"]), expected[["x"]]
+        )
+        pd.testing.assert_frame_equal(
+            redis_store.load_filtered(view, {"x": (4, 100)}), expected.iloc[1:]
+        )
+        pd.testing.assert_frame_equal(redis_store.load_many([view])[0], expected)
+        pd.testing.assert_frame_equal(
+            pd.concat(redis_store.load_chunks(view)), expected
+        )
+        with self.assertRaises(KeyError):
+            redis_store.save_view("missing", [0])
+        with self.assertRaises(ValueError):
+            redis_store.save_view(parent, [-1])
+
+
+class TestClients(unittest.TestCase):
+    """Tests for the lazily created clients of `redis_store`."""
+
+    def setUp(self):
+        self.pool_kwargs = redis_store.pool_kwargs
+
+    def tearDown(self):
+        redis_store.pool_kwargs = self.pool_kwargs
+        redis_store.configure()
+
+    def test_configure(self):
+        # no connection is made until the first command
+        redis_store.configure("redis://localhost:6379/1", max_connections=7)
+        client, async_client = redis_store.r, redis_store.async_r
+        self.assertIs(redis_store.r, client)
+        self.assertIs(redis_store.async_r, async_client)
+        for pool in [client.connection_pool, async_client.connection_pool]:
+            self.assertEqual(pool.max_connections, 7)
+            self.assertEqual(pool.connection_kwargs["db"], 1)
+            self.assertEqual(pool.connection_kwargs["socket_timeout"], 10)
+
+        redis_store.configure("redis://localhost:6379/2")
+        self.assertIsNot(redis_store.r, client)
+        self.assertIsNot(redis_store.async_r, async_client)
+        self.assertEqual(redis_store.r.connection_pool.connection_kwargs["db"], 2)
+        self.assertEqual(redis_store.r.connection_pool.max_connections, 7)
+
+    def test_reset_clients(self):
+        # registered with os.register_at_fork for child processes
+        redis_store.configure("redis://localhost:6379/0")
+        pool = redis_store.r.connection_pool
+        async_pool = redis_store.async_r.connection_pool
+        redis_store._reset_clients()
+        self.assertIsNot(redis_store.r.connection_pool, pool)
+        self.assertIsNot(redis_store.async_r.connection_pool, async_pool)
+        for name in ["host", "db", "socket_timeout"]:
+            self.assertEqual(
+                redis_store.r.connection_pool.connection_kwargs[name],
+                pool.connection_kwargs[name],
+            )
+
+
+class TestCodecs(unittest.TestCase):
+    """Tests for the DataFrame codecs in `CODECS`."""
+
+    def setUp(self):
+        self.df = pd.DataFrame(
+            {
+                "x": np.arange(10000.0),
+                "y": np.random.rand(10000),
+                "s": ["a", "b"] * 5000,
+                "i": np.arange(10000, dtype=np.int32),
+            },
+            index=np.arange(10000) * 2,
+        )
+
+    def test_round_trip(self):
+        for codec, (encode, decode) in CODECS.items():
+            with self.subTest(codec=codec):
+                if (
+                    codec.startswith("feather")
+                    and importlib.util.find_spec("pyarrow") is None
+                ):
+                    self.skipTest("Arrow IPC requires pyarrow")
+                serialized_value = encode(self.df)
+                self.assertIsInstance(serialized_value, bytes)
+                pd.testing.assert_frame_equal(decode(serialized_value), self.df)
+                pd.testing.assert_frame_equal(
+                    decode(serialized_value, columns=["y", "s"]), self.df[["y", "s"]]
+                )
+
+    def test_benchmark(self):
+        results = redis_store.benchmark(
+            self.df, codecs=["parquet", "parquet-zstd"], number=1
+        )
+        self.assertEqual(set(results.index), {"parquet", "parquet-zstd"})
+        self.assertEqual(list(results.columns), ["encode_ms", "decode_ms", "bytes"])
+        self.assertTrue((results > 0).all().all())
+        self.assertTrue(results["decode_ms"].is_monotonic_increasing)
+
+
+class TestLocalCache(unittest.TestCase):
+    """Tests for `LocalCache` and the loads through it."""
+
+    url = "fakeredis://"
+
+    def setUp(self):
+        redis_store.configure(self.url)
+        self.previous = {
+            name: getattr(redis_store, name)
+            for name in ["local_cache", "ttl", "max_bytes"]
+        }
+        redis_store.local_cache = LocalCache(max_bytes=2**20, touch_interval=0)
+        redis_store.ttl = {"pickle": 100}
+        redis_store.max_bytes = None
+
+    def tearDown(self):
+        redis_store.configure()
+        for name, value in self.previous.items():
+            setattr(redis_store, name, value)
+
+    def test_lru_and_counters(self):
+        cache = LocalCache(max_bytes=10)
+        cache.put("a", 1, 4)
+        cache.put("b", 2, 4)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3, 4)
+        cache.put("d", 4, 11)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(
+            cache.stats(),
+            {"hits": 2, "misses": 2, "entries": 2, "bytes": 8, "max_bytes": 10},
+        )
+
+    def test_lifetime_and_touches(self):
+        cache = LocalCache(touch_interval=10)
+        cache.put("a", 1, 4, ttl=100)
+        cache.put("b", 2, 4)
+        now = time.monotonic()
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.pop_due(), {})
+        with mock.patch.object(time, "monotonic", return_value=now + 20):
+            self.assertEqual(cache.get("a"), 1)
+            self.assertEqual(cache.get("b"), 2)
+            self.assertEqual(cache.get("a"), 1)
+        # at most once per touch_interval, then the lifetime starts again
+        self.assertEqual(cache.pop_due(), {"a": 100, "b": None})
+        self.assertEqual(cache.pop_due(), {})
+        with mock.patch.object(time, "monotonic", return_value=now + 110):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch.object(time, "monotonic", return_value=now + 1000):
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.stats()["bytes"], 4)
+
+    def test_hits_refresh_redis(self):
+        redis_store.max_bytes = 2**20
+        hash_key = redis_store.save({"a": 1})
+        key = redis_store._key(hash_key)
+        redis_store.load(hash_key)
+        # hash_key is the least recently used entry
+        redis_store.r.expire(key, 10)
+        redis_store.r.zadd(redis_store._lru_key(), {hash_key: 0, "other": 1})
+        for load in [
+            redis_store.load,
+            lambda hash_key: redis_store.load_many([hash_key])[0],
+            lambda hash_key: asyncio.run(redis_store.async_load(hash_key)),
+        ]:
+            with mock.patch.object(redis_store, "_fetch", side_effect=AssertionError):
+                self.assertEqual(load(hash_key), {"a": 1})
+            self.assertGreater(redis_store.r.ttl(key), 10)
+            self.assertEqual(
+                redis_store.r.zrange(redis_store._lru_key(), -1, -1),
+                [hash_key.encode("utf-8")],
+            )
+            redis_store.r.expire(key, 10)
+            redis_store.r.zadd(redis_store._lru_key(), {hash_key: 0})
+        self.assertEqual(redis_store.local_cache.stats()["hits"], 3)
+
+    def test_expired_entries_are_not_returned(self):
+        hash_key = redis_store.save({"a": 1})
+        redis_store.load(hash_key)
+        redis_store.r.delete(redis_store._key(hash_key))
+        self.assertEqual(redis_store.load(hash_key), {"a": 1})
+        with mock.patch.object(time, "monotonic", return_value=time.monotonic() + 101):
+            with self.assertRaises(KeyError):
+                redis_store.load(hash_key)
+
+
+class TestAsyncRedisStore(unittest.IsolatedAsyncioTestCase):
+    """Tests for `redis_store.async_*` against fakeredis."""
+
+    url = "fakeredis://"
+
+    def setUp(self):
+        """Use a new FakeRedis server, shared by the sync and the async client."""
+        redis_store.configure(self.url)
+        self.attributes = {
+            "local_cache": LocalCache(max_bytes=0),
+            "ttl": {},
+            "max_bytes": None,
+        }
+        self.previous = {name: getattr(redis_store, name) for name in self.attributes}
+        for name, value in self.attributes.items():
+            setattr(redis_store, name, value)
+        self.df = pd.DataFrame(
+            {"x": np.arange(100.0), "y": np.random.rand(100), "s": ["a", "b"] * 50}
+        )
+
+    def tearDown(self):
+        redis_store.configure()
+        for name, value in self.previous.items():
+            setattr(redis_store, name, value)
+
+    async def test_save_load(self):
+        hash_key = await redis_store.async_save(self.df)
+        pd.testing.assert_frame_equal(await redis_store.async_load(hash_key), self.df)
+        pd.testing.assert_frame_equal(
+            await redis_store.async_load(hash_key, columns=["y"]), self.df[["y"]]
+        )
+        hash_key = await redis_store.async_save({"a": [1, 2]})
+        self.assertEqual(await redis_store.async_load(hash_key), {"a": [1, 2]})
+
+    async def test_shared_with_sync_api(self):
+        hash_key = redis_store.save(self.df, codec="parquet-gzip")
+        pd.testing.assert_frame_equal(await redis_store.async_load(hash_key), self.df)
+        self.assertEqual(
+            await redis_store.async_save(
+                self.df, return_hit=True, codec="parquet-gzip"
+            ),
+            (hash_key, True),
+        )
+        hash_key = await redis_store.async_save([1, 2, 3])
+        self.assertEqual(redis_store.load(hash_key), [1, 2, 3])
+
+    async def test_chunks(self):
+        hash_key = redis_store.save(self.df, chunk_rows=30)
+        pd.testing.assert_frame_equal(await redis_store.async_load(hash_key), self.df)
+
+    async def test_many(self):
+        values = [self.df, {"b": 1}, self.df.iloc[::-1]]
+        hash_keys = await redis_store.async_save_many(values)
+        loaded = await redis_store.async_load_many(hash_keys)
+        pd.testing.assert_frame_equal(loaded[0], values[0])
+        self.assertEqual(loaded[1], values[1])
+        pd.testing.assert_frame_equal(loaded[2], values[2])
+
+    async def test_binary_values(self):
+        value = {
+            "x": np.arange(12, dtype=np.float32).reshape(3, 4),
+            "y": np.arange(6).reshape(2, 3).T,
+            "data": [{"type": "scatter", "x": np.linspace(0, 1, 5), "name": "a"}],
+            "t": (1, 2.5, None),
+        }
+        loaded = await redis_store.async_load(await redis_store.async_save(value))
+        for key in ["x", "y"]:
+            self.assertEqual(loaded[key].dtype, value[key].dtype)
+            np.testing.assert_array_equal(loaded[key], value[key])
+        np.testing.assert_array_equal(loaded["data"][0]["x"], value["data"][0]["x"])
+        self.assertEqual(loaded["t"], value["t"])
+
+    async def test_missing(self):
+        with self.assertRaises(KeyError):
+            await redis_store.async_load("missing")
+
+    async def test_ttl_and_eviction(self):
+        redis_store.ttl = {"pickle": 100}
+        redis_store.max_bytes = 2**20
+        hash_key = await redis_store.async_save({"c": 1})
+        self.assertGreater(await redis_store.async_r.ttl(redis_store._key(hash_key)), 0)
+        redis_store.max_bytes = 1
+        await redis_store.async_save({"c": 2})
+        with self.assertRaises(KeyError):
+            await redis_store.async_load(hash_key)
+
+
+class TestMemoize(unittest.TestCase):
+    """Tests for `redis_store.memoize` against fakeredis."""
+
+    url = "fakeredis://"
+
+    def setUp(self):
+        redis_store.configure(self.url)
+        self.previous = redis_store.memo_stats
+        redis_store.memo_stats = MemoStats()
+        self.calls = []
+
+        @redis_store.memoize(namespace="test", version=1)
+        def slow(a, b=2, c=None):
+            self.calls.append(a)
+            time.sleep(0.2)
+            return {"a": np.arange(3) * a, "c": c}
+
+        self.slow = slow
+
+    def tearDown(self):
+        redis_store.configure()
+        redis_store.memo_stats = self.previous
+
+    def test_canonical_arguments(self):
+        value = self.slow(1, c={"x": [1, 2.5], "y": None})
+        np.testing.assert_array_equal(value["a"], [0, 1, 2])
+        loaded = self.slow(a=1, b=2, c={"y": None, "x": [1, 2.5]})
+        np.testing.assert_array_equal(loaded["a"], value["a"])
+        self.assertEqual(loaded["c"], value["c"])
+        self.slow(np.int64(1), c={"x": [1, 2.5], "y": None})
+        self.slow(1, b=3)
+        self.assertEqual(self.calls, [1, 1])
+        self.assertEqual(
+            redis_store.memo_stats.stats()["test"],
+            {"hits": 2, "misses": 2, "waits": 0, "hit_rate": 0.5},
+        )
+
+    def test_single_flight(self):
+        threads = [threading.Thread(target=self.slow, args=(3,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, [3])
+        self.assertEqual(redis_store.memo_stats.hits["test"], 4)
+
+    def test_ttl_and_copies(self):
+        @redis_store.memoize(namespace="ttl", ttl=100)
+        def values(a):
+            self.calls.append(a)
+            return {"a": [a]}
+
+        values(1)["a"].append(2)
+        values(1)["a"].append(3)
+        self.assertEqual(values(1), {"a": [1]})
+        self.assertEqual(self.calls, [1])
+        # the result expires with its memo key
+        hash_key = redis_store.save({"a": [1]})
+        self.assertTrue(0 < redis_store.r.ttl(redis_store._key(hash_key)) <= 100)
+
+    def test_bypass_and_errors(self):
+        redis_store.memo_bypass = True
+        try:
+            self.slow(4)
+            self.slow(4)
+        finally:
+            redis_store.memo_bypass = False
+        self.assertEqual(self.calls, [4, 4])
+
+        @redis_store.memoize(namespace="error")
+        def fail(a):
+            self.calls.append(a)
+            raise ValueError(a)
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                fail(5)
+        self.assertEqual(self.calls, [4, 4, 5, 5])
+
+    def test_unsaveable_result(self):
+        @redis_store.memoize(namespace="unsaveable")
+        def unsaveable(a):
+            self.calls.append(a)
+            return {"a": object()}
+
+        with self.assertLogs("mpships.redis_store", "ERROR"):
+            first = unsaveable(6)
+        self.assertIsInstance(first["a"], object)
+        # not stored, and the lock is released for the next call
+        self.assertIsNot(unsaveable(6), first)
+        self.assertEqual(self.calls, [6, 6])
+        self.assertEqual(redis_store.r.keys("*unsaveable*"), [])
+
+
+class FileRedisURL:
+    """Runs the tests of a TestCase against FileRedis in a temporary directory."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"file://{self.directory.name}"
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+
+class TestFileRedisStore(FileRedisURL, TestRedisStore):
+    """Tests for saving and loading with `redis_store` against FileRedis."""
+
+
+class TestFileLocalCache(FileRedisURL, TestLocalCache):
+    """Tests for `LocalCache` and the loads through it against FileRedis."""
+
+
+class TestAsyncFileRedisStore(FileRedisURL, TestAsyncRedisStore):
+    """Tests for `redis_store.async_*` against FileRedis."""
+
+
+class TestFileRedisMemoize(FileRedisURL, TestMemoize):
+    """Tests for `redis_store.memoize` against FileRedis."""
@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+
+"""Tests for the thermodynamic kernels of `mpships.redox_thermo_csp`."""
+
+
+import gzip
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from scipy.integrate import quad
+
+try:
+    import mp_web  # noqa: F401
+
+    stubs = {}
+except ImportError:  # the kernels only need get_rester to be importable
+    stubs = {
+        name: mock.MagicMock()
+        for name in ["mp_web", "mp_web.core", "mp_web.core.utils"]
+    }
+
+# only the stubs are removed again, the modules imported with them are kept
+for name, stub in stubs.items():
+    sys.modules.setdefault(name, stub)
+try:
+    from mpships.redox_thermo_csp import redox_utils as ru
+    from mpships.redox_thermo_csp import redox_views as rv
+finally:
+    for name in stubs:
+        del sys.modules[name]
+
+
+ACT_VALUES = [0.0, 0.05, 0.4, 1.0]
+TD_PEROV, TD_BROWNM = 550.0, 450.0
+DH_MIN, DH_MAX = 250e3, 380e3
+
+
+def _act_mat(act):
+    return [[], act]
+
+
+def _isographs():
+    """isotherms and isobars as (iso, x) arguments of funciso_theo"""
+    p_o2_l = np.log(np.logspace(-5, 1, 10))
+    temps = np.linspace(600, 1600, 10)
+    return [
+        (p_o2_l, 1000.0),
+        (p_o2_l, 1400.0),
+        (np.log(1e-3), temps),
+        (np.log(1e2), temps),
+    ]
+
+
+class TestRootfind(unittest.TestCase):
+    """Tests for the batch root finder of the theoretical isographs."""
+
+    a, b = 1e-10, 0.5 - 1e-10
+
+    def test_rootfind_vec_matches_rootfind(self):
+        for act in ACT_VALUES:
+            rest = (None, TD_PEROV, TD_BROWNM, DH_MIN, DH_MAX, _act_mat(act))
+            for iso, x in _isographs():
+                delta = ru.rootfind_vec(
+                    self.a, self.b, (iso, x) + rest, ru.funciso_theo_vec
+                )
+                expected = []
+                for iso_i, x_i in zip(*np.broadcast_arrays(iso, x)):
+                    args = (iso_i, x_i) + rest
+                    solution = ru.rootfind(self.a, self.b, args, ru.funciso_theo)
+                    expected.append(np.nan if solution is None else solution)
+                np.testing.assert_allclose(delta, expected, rtol=0, atol=1e-6)
+
+    def test_solve_bracketed_without_sign_change(self):
+        roots = ru.solve_bracketed(
+            lambda x, c: x**2 - c, 0.0, 2.0, args=(np.array([1.0, 2.0, 5.0]),)
+        )
+        np.testing.assert_allclose(roots[:2], [1.0, np.sqrt(2.0)], rtol=1e-12)
+        self.assertTrue(np.isnan(roots[2]))
+
+
+class TestThermoCache(unittest.TestCase):
+    """Tests for the memo of the kernels decorated with thermo_memo."""
+
+    def test_positional_and_keyword_calls(self):
+        args = (0.1, DH_MIN, DH_MAX, 1000.0, 0.4)
+        with ru.thermo_cache() as cache:
+            value = ru.p_o2_calc(*args)
+            self.assertEqual(
+                ru.p_o2_calc(delta=0.1, dh_1=DH_MIN, dh_2=DH_MAX, temp=1000.0, act=0.4),
+                value,
+            )
+        self.assertEqual(cache.hits["p_o2_calc"], 1)
+        self.assertEqual(cache.misses["p_o2_calc"], 1)
+
+    def test_list_and_equal_array(self):
+        temps = [800.0, 1000.0, 1200.0]
+        with ru.thermo_cache() as cache:
+            value = ru.p_o2_calc_vec(0.1, DH_MIN, DH_MAX, temps, 0.4)
+            np.testing.assert_array_equal(
+                ru.p_o2_calc_vec(0.1, DH_MIN, DH_MAX, np.array(temps), 0.4), value
+            )
+        self.assertEqual(cache.hits["p_o2_calc_vec"], 1)
+        self.assertEqual(cache.misses["p_o2_calc_vec"], 1)
+        # cached arrays are shared between callers
+        self.assertFalse(value.flags.writeable)
+
+    def test_no_memo_outside_of_context(self):
+        with ru.thermo_cache() as cache:
+            pass
+        with mock.patch.object(ru, "brentq", wraps=ru.brentq) as brentq:
+            ru.p_o2_calc(0.1, DH_MIN, DH_MAX, 1000.0, 0.4)
+            calls = brentq.call_count
+            ru.p_o2_calc(0.1, DH_MIN, DH_MAX, 1000.0, 0.4)
+            self.assertEqual(brentq.call_count, 2 * calls)
+        self.assertEqual(cache.values, {})
+        self.assertIsNone(ru._thermo_cache.get())
+
+
+class TestClosedForm(unittest.TestCase):
+    """Tests for the closed-form theoretical isotherms and isobars."""
+
+    def test_delta_theo_closed_form_matches_root_finding(self):
+        for act in ACT_VALUES:
+            rest = (None, TD_PEROV, TD_BROWNM, DH_MIN, DH_MAX, _act_mat(act))
+            for iso, x in _isographs():
+                delta = ru.delta_theo_closed_form(iso, x, *rest[1:])
+                expected = ru.rootfind_vec(
+                    1e-10, 0.5 - 1e-10, (iso, x) + rest, ru.funciso_theo_vec
+                )
+                found = ~np.isnan(expected)
+                # solutions of the root finder are never lost
+                self.assertFalse(np.isnan(delta[found]).any())
+                np.testing.assert_allclose(
+                    delta[found], expected[found], rtol=0, atol=1e-5
+                )
+
+
+class TestEnthalpy(unittest.TestCase):
+    """Tests for the analytic enthalpy derivative."""
+
+    def test_d_h_implicit_matches_numerical_derivative(self):
+        delta = np.array([0.01, 0.05, 0.2, 0.4])[:, None]
+        temps = np.array([600.0, 1000.0, 1500.0])
+        for act in ACT_VALUES:
+            dh = ru.d_h_analytic_calc(delta, DH_MIN, DH_MAX, temps, _act_mat(act))
+            expected = [
+                [
+                    ru.d_h_num_dev_calc(d, DH_MIN, DH_MAX, t, _act_mat(act))
+                    for t in temps
+                ]
+                for d in delta[:, 0]
+            ]
+            np.testing.assert_allclose(dh, expected, rtol=1e-5)
+            p_o2_l = np.log(ru.p_o2_calc_vec(delta, DH_MIN, DH_MAX, temps, act))
+            np.testing.assert_array_equal(
+                ru.d_h_implicit(temps, p_o2_l, DH_MIN, DH_MAX, act), dh
+            )
+
+
+class TestDebye(unittest.TestCase):
+    """Tests for the interpolation table of the Debye function."""
+
+    def test_debye_function_matches_quad(self):
+        # beyond the table, the asymptotic form is used
+        y = np.concatenate([np.linspace(0, 50, 201), [50.01, 60.0, 200.0]])
+        expected = [ru.debye_integral(v) for v in y]
+        np.testing.assert_allclose(ru.debye_function(y), expected, rtol=1e-8)
+        self.assertIs(ru.debye_table(), ru.debye_table())
+
+    def test_vib_ent_matches_quad(self):
+        temps = np.concatenate([[1.0, 10.0], np.linspace(200, 2500, 24)])
+        np.testing.assert_allclose(
+            ru.vib_ent(temps, TD_PEROV, TD_BROWNM),
+            ru.vib_ent(temps, TD_PEROV, TD_BROWNM, mode="quad"),
+            rtol=1e-8,
+        )
+        with self.assertRaises(ValueError):
+            ru.vib_ent(1000.0, TD_PEROV, TD_BROWNM, mode="spline")
+
+
+class TestShomate(unittest.TestCase):
+    """Tests for the Shomate kernels."""
+
+    def test_c_p_water_liquid(self):
+        # values of the scalar implementation before vectorization
+        temps = [273.15, 298.15, 323.15, 373.15, 500.0]
+        expected = [
+            76.09507577428045,
+            75.37492869068849,
+            75.27710026895294,
+            75.99345114402632,
+            83.66392899999997,
+        ]
+        for temp, c_p in zip(temps, expected):
+            self.assertAlmostEqual(ru.c_p_water_liquid(temp), c_p, places=10)
+        np.testing.assert_allclose(
+            ru.c_p_water_liquid_vec(np.array(temps)), expected, rtol=1e-12
+        )
+
+    def test_c_p_integral_matches_quad(self):
+        # across the range limit of steam at 1700 K
+        for temp_1, temp_2 in [(400.0, 1500.0), (500.0, 1900.0), (1800.0, 1650.0)]:
+            energy = ru.shomate_c_p_integral(temp_1, temp_2, *ru.SHOMATE_STEAM)
+            expected = quad(ru.c_p_steam, temp_1, temp_2, points=[1700.0])[0]
+            self.assertAlmostEqual(energy / expected, 1, places=8)
+
+    def test_energy_steam_generation_matches_quad(self):
+        def energy_quad(temp_1, temp_2, h_2_h2o, h_rec):
+            """energy in kJ/mol of the previous implementation, temperatures in K"""
+            energy = 0.0
+            if temp_1 < 373.15:
+                energy += quad(ru.c_p_water_liquid, temp_1, min(temp_2, 373.15))[0]
+            if temp_2 > 373.15:
+                temp = max(temp_1, 373.15)
+                energy += quad(ru.c_p_steam, temp, temp_2, points=[1700.0])[0]
+            if temp_1 < 373.15 < temp_2:
+                energy += 40790
+            return energy / h_2_h2o * (1 - h_rec) / 1000
+
+        # across the boiling point, the range limit of steam, or both
+        cases = [(298.15, 673.15), (298.15, 350.0), (400.0, 1900.0), (283.15, 1800.0)]
+        for temp_1, temp_2 in cases:
+            expected = energy_quad(temp_1, temp_2, 0.5, 0.3)
+            energy = ru.energy_steam_generation(
+                temp_1, temp_2, 0.5, celsius=False, h_rec=0.3
+            )
+            self.assertAlmostEqual(energy / expected, 1, places=8)
+        temp_1, temp_2 = np.array(cases).T
+        np.testing.assert_allclose(
+            ru.energy_steam_generation_vec(
+                temp_1 - 273.15, temp_2 - 273.15, 0.5, h_rec=0.3
+            ),
+            [energy_quad(*case, 0.5, 0.3) for case in cases],
+            rtol=1e-8,
+        )
+
+    def test_vec_matches_scalar(self):
+        # values of the scalar implementation before vectorization, including the
+        # range limits (exclusive for s_th_o and c_p_steam, inclusive otherwise)
+        expected = {
+            (ru.s_th_o, ru.s_th_o_vec): (
+                [300.0, 700.0, 1000.0, 2000.0, 2500.0],
+                [
+                    102.66453088940811,
+                    115.7326825944355,
+                    121.789388,
+                    134.37410817777277,
+                    138.64498624226715,
+                ],
+            ),
+            (ru.c_p_steam, ru.c_p_steam_vec): (
+                [400.0, 1700.0, 2000.0],
+                [34.26311722999999, 48.90566946049481, 51.20178799999999],
+            ),
+            (ru.dhf_h2o, ru.dhf_h2o_vec): (
+                [500.0, 1700.0, 2000.0],
+                [-234.90175520833333, -184.06660987915689, -169.03519133333336],
+            ),
+            (ru.dh_co_co2, ru.dh_co_co2_vec): (
+                [500.0, 1200.0, 1250.0, 1300.0, 1500.0],
+                [
+                    -280.61886670833337,
+                    -266.95090595013335,
+                    -265.8422019656901,
+                    -264.7185538862468,
+                    -260.1405645729167,
+                ],
+            ),
+        }
+        for (scalar, vec), (temps, values) in expected.items():
+            for temp, value in zip(temps, values):
+                self.assertIsInstance(scalar(temp), float)
+                self.assertAlmostEqual(scalar(temp), value, places=10)
+            np.testing.assert_allclose(vec(np.array(temps)), values, rtol=1e-12)
+            np.testing.assert_allclose(
+                vec(np.array(temps).reshape(-1, 1)), np.reshape(values, (-1, 1))
+            )
+
+
+def _energy_rows(n, seed=0):
+    """random results of the energy analysis, one row per material"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        delta_1 = rng.uniform(0, 0.2)
+        rows.append(
+            {
+                "Chemical Energy": rng.uniform(-50, 400),
+                "Sensible Energy": rng.uniform(10, 200),
+                "T_ox": 773.15,
+                "T_red": rng.choice([1173.15, 1273.15, 1573.15]),
+                "delta_1": delta_1,
+                "delta_2": delta_1 + rng.uniform(-0.02, 0.2),
+                "g_prod_kg_red": rng.uniform(-1, 10),
+                "l_prod_kg_red": rng.uniform(-1, 10),
+                "mass_redox": rng.uniform(-0.5, 3),
+                "mol_mass_ox": rng.uniform(150, 300),
+                "mol_prod_mol_red": rng.uniform(-0.01, 0.2),
+                "p_ox": 1e-3,
+                "p_red": rng.choice([1e-7, 1e-4, 1e-2, 0.8]),
+                "compstr": f"{rng.choice(['Sr', 'Ca', 'La'])}1{rng.choice(['Fe', 'Mn'])}1Ox",
+                "prodstr": "H2",
+                "prodstr_alt": "H2",
+                "unstable": bool(rng.random() < 0.1),
+            }
+        )
+    return rows
+
+
+class TestEnergyResults(unittest.TestCase):
+    """Tests for the rankings of energy_on_the_fly."""
+
+    def setUp(self):
+        self.rows = _energy_rows(200)
+        self.rows += [dict(self.rows[3]), dict(self.rows[10])]
+        self.results = ru.energy_on_the_fly(
+            "Water Splitting",
+            [{"energy_analysis": self.rows}],
+            -1,
+            25,
+            0.5,
+            0.3,
+            p_ox_wscs=0.5,
+        )
+
+    def total_energy(self, row):
+        """total energy in kJ/mol redox material, calculated with the scalar functions"""
+        t_mean = (row["T_ox"] + row["T_red"]) / 2
+        chemical_energy = row["Chemical Energy"] * 1000
+        dh_wscs = ru.dhf_h2o(t_mean) * row["mol_prod_mol_red"]
+        energy_dh = (chemical_energy - (chemical_energy + dh_wscs * 1000) * 0.5) / 1000
+        energy_pumping = ru.mechanical_envelope(row["p_red"]) * row["mol_prod_mol_red"]
+        energy_steam = row["mol_prod_mol_red"] * ru.energy_steam_generation(
+            25, t_mean - 273.15, 0.5, h_rec=0.3
+        )
+        return energy_dh + row["Sensible Energy"] * 0.5 + energy_pumping + energy_steam
+
+    def test_top_matches_scalar_ranking(self):
+        # negative energies and unstable materials are ranked last
+        energies = [
+            (
+                float("inf")
+                if self.total_energy(row) < 0 or row["unstable"]
+                else self.total_energy(row)
+            )
+            for row in self.rows
+        ]
+        order = sorted(range(len(self.rows)), key=lambda i: energies[i])
+        for k in [1, 15, 100, None]:
+            top = self.results.top("kJ/mol redox material", k)
+            expected = order[:k]
+            np.testing.assert_allclose(
+                top["Total Energy"], [energies[i] for i in expected], rtol=1e-9
+            )
+            self.assertEqual(
+                list(top["material"]),
+                [ru.remove_comp_one(self.rows[i]["compstr"]) for i in expected],
+            )
+
+    def test_top_matches_full_ranking(self):
+        for metric in self.results:
+            ranking = self.results[metric]
+            for k in [1, 15, 100]:
+                pd.testing.assert_frame_equal(
+                    self.results.top(metric, k), ranking.iloc[:k]
+                )
+            pd.testing.assert_frame_equal(
+                self.results.top(metric, 15, drop_duplicates=True),
+                ranking.drop_duplicates(ignore_index=True).iloc[:15],
+            )
+
+
+def _exp_pars(compstr, act):
+    """parameters of the experimental data of compstr, initialized like in the app"""
+    theo_data = {
+        "collection": [
+            {
+                "_id": "test",
+                "pars": {
+                    "theo_compstr": compstr,
+                    "data_availability": "Exp + Theo",
+                    "elastic": {
+                        "Debye temp perovskite": TD_PEROV,
+                        "Debye temp brownmillerite": TD_BROWNM,
+                        "Elastic tensors available": False,
+                    },
+                    "dh_min": DH_MIN / 1000,
+                    "dh_max": DH_MAX / 1000,
+                    "act_mat": _act_mat(act),
+                    "last_updated": "",
+                },
+                "data": {"oxidized_phase": {"composition": compstr}},
+            }
+        ]
+    }
+    path = os.path.join(os.path.dirname(rv.__file__), "exp_data.json.gz")
+    with gzip.open(path, "r") as exp_file:
+        exp_data = json.load(exp_file)
+    return rv.InitData.init_isographs(theo_data, exp_data, compstr=compstr)[1]
+
+
+class TestExperimentalIsographs(unittest.TestCase):
+    """Tests for the parametric evaluation of the experimental isographs."""
+
+    def test_parametric_matches_rootfind(self):
+        # funciso has several roots in delta for these isographs
+        cases = [
+            ("Ca0.25Sr0.75Mn0.625Fe0.375Ox", 1.0, "isotherm", 1400.0, [-10, 1]),
+            ("Ca0.875Sr0.125Mn0.75Fe0.25Ox", 1.0, "isobar", np.log(1e-3), [500, 1800]),
+            (
+                "Ca0.625Sr0.375Mn0.375Fe0.625Ox",
+                0.4,
+                "isobar",
+                np.log(1e-3),
+                [500, 1800],
+            ),
+            ("Ca0.625Sr0.375Ti0.125Mn0.875Ox", 0.4, "isotherm", 1000.0, [-10, 1]),
+            ("Sr1Fe1Ox", 0.4, "isoredox", 0.1, [700, 1600]),
+        ]
+        for compstr, act, plottype, iso, rng in cases:
+            pars = _exp_pars(compstr, act)
+            results = []
+            for exp_mode in ["rootfind", "parametric"]:
+                isographs = rv.Isographs(compstr, plottype, iso, rng, exp_mode=exp_mode)
+                payload, x_val = isographs.prepare_limits()
+                response = isographs.isographs(pars, payload, x_val)
+                results.append(
+                    [
+                        np.nan if y is None else y
+                        for y in response[0]["y"] + response[1]["y"]
+                    ]
+                )
+            np.testing.assert_allclose(results[1], results[0], rtol=1e-8, atol=1e-10)
+
+
+class TestIsoredox(unittest.TestCase):
+    """Tests for the theoretical isoredox lines."""
+
+    def test_closed_form_matches_root_finding(self):
+        temps = np.linspace(400, 1800, 50)
+        for act in ACT_VALUES:
+            for delta in [0.01, 0.1, 0.3, 0.45]:
+                args = (delta, temps, None, TD_PEROV, TD_BROWNM, DH_MIN, DH_MAX)
+                args = args + (_act_mat(act),)
+                p_o2_l = ru.solve_bracketed(
+                    ru.funciso_redox_theo_vec, -300, 300, args=args
+                )
+                p_o2 = ru.isoredox_theo_closed_form(delta, temps, *args[3:])
+                np.testing.assert_allclose(np.log(p_o2), p_o2_l, atol=1e-9)
+
+    def test_closed_form_out_of_range(self):
+        p_o2 = ru.isoredox_theo_closed_form(
+            0.1,
+            np.array([300.0, 1000.0]),
+            TD_PEROV,
+            TD_BROWNM,
+            DH_MIN,
+            DH_MAX,
+            _act_mat(0.4),
+            lim=1,
+        )
+        self.assertTrue(np.isnan(p_o2).all())